@@ -8,6 +8,7 @@
 """
 # Standard Libraries
 from typing import Optional, List, Tuple
+from functools import lru_cache
 import os
 import sys
 
@@ -26,8 +27,11 @@ import topobuilder.utils as TButil
 __all__ = ['get_steps', 'process_master_geometries']
 
 
-def get_steps( blist: List[bool] ) -> List[Tuple[int]]:
-    """
+@lru_cache(maxsize=256)
+def get_steps( blist: Tuple[bool] ) -> Tuple[Tuple[int]]:
+    """Layer steps for the architecture, given which layers are beta layers.
+
+    Results are cached, so ``blist`` has to be a :class:`tuple`.
     """
     def cstp(seq):
         return [seq[i] for i in range(len(seq)) if len(seq[i]) == 1 or (seq[i][0] + 1 == seq[i][1])]
@@ -53,17 +57,7 @@ def get_steps( blist: List[bool] ) -> List[Tuple[int]]:
         for i in range(0, len(plist) - 1):
             steps.append(tuple(plist[i: i + 2]))
         steps = f7(cstp(steps))
-    return steps
-
-
-# assert get_steps([True, False]) == [(0,), (0, 1)]
-# assert get_steps([False, True]) == [(1,), (0, 1)]
-# assert get_steps([False, False]) == [(0,), (0, 1)]
-# assert get_steps([False, False, False]) == [(0,), (0, 1), (1, 2)]
-# assert get_steps([False, True, False]) == [(1,), (0, 1), (1, 2)]
-# assert get_steps([False, True, True, False]) == [(1,), (1, 2), (0, 1), (2, 3)]
-# assert get_steps([False, True, False, True]) == [(1,), (3,), (0, 1), (1, 2), (2, 3)]
-# assert get_steps([False, True, True, False, True]) == [(1,), (4,), (1, 2), (0, 1), (2, 3), (3, 4)]
+    return tuple(steps)
 
 
 def process_master_geometries( masterdf: pd.DataFrame,
@@ -91,38 +85,44 @@ def process_master_geometries( masterdf: pd.DataFrame,
                 each vector and the planes
     =========== ========================================= =======
     """
+    verbose = TBcore.get_option('system', 'verbose')
+
     # Define PDB database.
     with SBIcr.on_option_value('structure', 'format', 'pdb'):
         pdbdb = SBIdb.PDBLink(TBcore.get_option('master', 'pdb'))
-        if TBcore.get_option('system', 'verbose'):
+        if verbose:
             sys.stdout.write('Set PDB database as: {}\n'.format(TBcore.get_option('master', 'pdb')))
 
     # Prepare data: Sort by structure-chain to avoid multi-reading
     newdf = masterdf.sort_values(['pdb', 'chain'])
     pdb3d = None
 
-    def execute( row, structures, flip ):
-        # 1. Download file
+    def execute( group, structures, flip ):
+        # 1. Download file (once per structure-chain group)
         nonlocal pdbdb
         nonlocal pdb3d
-        filename, pdb3d = download_pdb(pdbdb, pdb3d, row['pdb'], row['chain'])
-        pdb3d = pdb3d['AtomType:CA']
-        df = TButil.pdb_geometry_from_rules(pdb3d, list(zip(structures, row['match'], flip)))
-        df = df.assign(pdb=[row['pdb'], ] * df.shape[0])
-        df = df.assign(chain=[row['chain'], ] * df.shape[0])
-        df = df.assign(rmsd=[row['rmsd'], ] * df.shape[0])
-        df = df.assign(match=[row['match'], ] * df.shape[0])
-        df['pdb_path'] = [filename, ] * df.shape[0]
-        if TBcore.get_option('system', 'verbose'):
+        pdbid, pdbchain = group.name
+        filename, pdb3d = download_pdb(pdbdb, pdb3d, pdbid, pdbchain)
+        pdbca = pdb3d['AtomType:CA']
+
+        # 2. Geometries for each match in the group
+        data = []
+        for rmsd, match in zip(group['rmsd'].values, group['match'].values):
+            df = TButil.pdb_geometry_from_rules(pdbca, list(zip(structures, match, flip)))
+            df = df.assign(pdb=[pdbid, ] * df.shape[0])
+            df = df.assign(chain=[pdbchain, ] * df.shape[0])
+            df = df.assign(rmsd=[rmsd, ] * df.shape[0])
+            df = df.assign(match=[match, ] * df.shape[0])
+            df['pdb_path'] = [filename, ] * df.shape[0]
+            data.append(df)
+        if verbose:
             sys.stdout.flush()
-        return df
+        return pd.concat(data)
 
     # Get the appropiate path each structure should have.
-    data = []
-    for _, row in newdf.iterrows():
-        data.append(execute(row, structures, flip))
-    return pd.concat(data)
-    return newdf.apply(execute, axis=1, result_type='broadcast', args=(structures, flip))
+    # execute only reads rmsd and match (the group keys come from group.name).
+    groups = newdf.groupby(['pdb', 'chain'], sort=False)[['rmsd', 'match']]
+    return groups.apply(execute, structures, flip).reset_index(drop=True)
 
 
 def download_pdb( pdbdb: SBIdb.PDBLink,
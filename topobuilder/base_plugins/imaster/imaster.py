@@ -10,9 +10,9 @@
 import argparse
 from pathlib import Path
 from operator import itemgetter
-from itertools import cycle
 
 # External Libraries
+import numpy as np
 
 # This Library
 import topobuilder.utils as TButil
@@ -45,8 +45,10 @@ def main( options ):
     # Get connectivities
     sse = case.connectivities_str[0].split('.')
     # Get flips
-    flip = cycle([case['configuration.flip_first'], not case['configuration.flip_first']])
-    flip = [next(flip) for _ in range(len(sse))]
+    flip = np.empty(len(sse), dtype=bool)
+    flip[0::2] = case['configuration.flip_first']
+    flip[1::2] = not case['configuration.flip_first']
+    flip = flip.tolist()
     # Select only the present ones.
     present = [sse.index(i) for i in options.present.split('.')]
     sse = list(itemgetter(*present)(sse))
@@ -55,7 +57,7 @@ def main( options ):
     # Geometric properties retrieval
     masterdf = process_master_geometries(masterdf, sse, flip)
     # Output data
-    masterdf.to_csv(str(options.out) + '.csv', index=False)
+    masterdf.to_csv(str(options.out) + '.csv', index=False, chunksize=50000)
 
 
 if __name__ == '__main__':
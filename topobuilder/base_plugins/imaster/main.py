@@ -9,10 +9,12 @@
 # Standard Libraries
 from typing import Optional, List, Dict, Set
 from string import ascii_uppercase
-from operator import itemgetter
 from subprocess import run, DEVNULL
 from pathlib import Path
-from itertools import cycle
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import shutil
+import copy
 import shlex
 import math
 import os
@@ -21,8 +23,8 @@ import sys
 # External Libraries
 import numpy as np
 import pandas as pd
-import scipy as sc
 import networkx as nx
+import matplotlib.pyplot as plt
 
 # This Library
 from topobuilder.case import Case
@@ -34,6 +36,15 @@ from .analysis import get_steps
 
 __all__ = ['apply', 'case_apply']
 
+_LAYER_IDX = {c: i for i, c in enumerate(ascii_uppercase)}
+_RMSD_BINS = np.array([0, 2, 2.5, 3, 5])
+_RMSD_LABELS = ['close', 'mid', 'far', 'extreme']
+_ANGLE_BINS = np.arange(-100, 105, 5)
+_ANGLE_LABELS = np.arange(-97.5, 100, 5)
+_STATS_DTYPES = {'pdb': str, 'chain': str, 'layer': str, 'sse': str, 'rmsd': np.float64}
+# Values per KDE evaluation block: 200 grid points x 4096 values ~ 6.5MB per temporary.
+_KDE_BLOCK = 4096
+
 
 def apply( cases: List[Case],
            prtid: int,
@@ -75,13 +86,17 @@ def case_apply( case: Case,
     wfolder = kase.connectivities_paths[0].joinpath('imaster')
     wfolder.mkdir(parents=True, exist_ok=True)
     current_case_file = kase.cast_absolute().write(wfolder.joinpath('current'))
+    cachedir = wfolder.parent.parent
+    searchkey = None
 
     # Find steps: Tops we will submit 2-layer searches
-    steps = get_steps([x[-1] == 'E' for x in kase.architecture_str.split('.')])
+    steps = get_steps(tuple(x[-1] == 'E' for x in kase.architecture_str.split('.')))
     steps = [steps[step], ] if step is not None and TBcore.get_option('system', 'jupyter') else steps
 
     # Work by layers
     done_l = set()
+    builder = plugin_source.load_plugin('builder')
+    CKase, applied = None, None
     for i, step in enumerate(steps):
         # Step working directory
         stepfolder = wfolder.joinpath('step{:02d}'.format(i + 1))
@@ -98,34 +113,49 @@ def case_apply( case: Case,
             # CKase = CKase.apply_corrections(corrections)
             continue
 
-        # Apply corrections from previous steps and rebuild
-        CKase = Case(kase).apply_corrections(corrections)
-        with TBcore.on_option_value('system', 'overwrite', True):
-            CKase = plugin_source.load_plugin('builder').case_apply(CKase, connectivity=True)
+        # Apply corrections from previous steps and rebuild (unless they did not change)
+        if CKase is None or corrections != applied:
+            applied = copy.deepcopy(corrections)
+            CKase = kase.apply_corrections(corrections)
+            with TBcore.on_option_value('system', 'overwrite', True):
+                CKase = builder.case_apply(CKase, connectivity=True)
 
         # Generate structure query and get layer displacements
-        layers = set(itemgetter(*step)(ascii_uppercase))
-        sses = [sse for sse in CKase.ordered_structures if sse['id'][0] in layers]
-        structure, cends = TButil.build_pdb_object(sses, 3)
+        layer_mask = 0
+        for layer in step:
+            layer_mask |= 1 << int(layer)
+        sses = [sse for sse in CKase.ordered_structures if (layer_mask >> _LAYER_IDX[sse['id'][0]]) & 1]
+        structure, _ = TButil.build_pdb_object(sses, 3)
         TButil.plugin_filemaker('Writing structure {0}'.format(query))
         structure.write(output_file=str(query), format='pdb', clean=True, force=True)
 
-        flip = cycle([CKase['configuration.flip_first'], not CKase['configuration.flip_first']])
         counts = np.asarray([sse['length'] for sse in CKase.ordered_structures])
         cends = np.cumsum(counts)
         cstrs = cends - counts + 1
+        flips = np.empty(len(counts), dtype=bool)
+        flips[0::2] = CKase['configuration.flip_first']
+        flips[1::2] = not CKase['configuration.flip_first']
 
         rules = list(zip([sse['id'] for sse in CKase.ordered_structures],
-                         list(zip(cstrs, cends)),
-                         list(next(flip) for _ in range(len(CKase.ordered_structures)))))
+                         zip(cstrs.tolist(), cends.tolist()),
+                         flips.tolist()))
         extras = TButil.pdb_geometry_from_rules(query, rules)
 
-        # MASTER search
-        createpds = TButil.createPDS(query)
-        TButil.plugin_bash(createpds)
-        run(createpds, stdout=DEVNULL)
+        # MASTER search (identical queries are shared through the cache)
+        qhash = query_hash(query)
+        # MASTER matches are only reusable for the same targets, executable and RMSD cut.
+        searchkey = search_fingerprint(rmsd) if searchkey is None else searchkey
+        pdscache = cachedir.joinpath('.pds_cache', '{}.pds'.format(qhash))
+        mastercache = cachedir.joinpath('.master_cache', '{0}_{1}.master'.format(qhash, searchkey))
+        if not cache_link(pdscache, query.with_suffix('.pds')):
+            createpds = TButil.createPDS(query)
+            TButil.plugin_bash(createpds)
+            run(createpds, stdout=DEVNULL)
+            cache_store(query.with_suffix('.pds'), pdscache)
+        cache_link(mastercache, stepfolder.joinpath('match.master'))
         masters = TButil.master_best_each(query.with_suffix('.pds'), stepfolder.joinpath('_master'), rmsd)
         data = submit_searches(masters, stepfolder, current_case_file, '.'.join([x['id'] for x in sses]))
+        cache_store(data['matches'], mastercache)
         data = calc_corrections(data, kase, set(data['layers']), done_l, extras, bin)
 
         kase.data['metadata']['imaster'].setdefault('step{:02d}'.format(i + 1), data)
@@ -137,6 +167,53 @@ def case_apply( case: Case,
     return kase
 
 
+def query_hash( query: Path ) -> str:
+    """Content hash of a query structure, used as key of the search caches.
+    """
+    return hashlib.blake2b(Path(query).read_bytes(), digest_size=16).hexdigest()
+
+
+def search_fingerprint( rmsd: float ) -> str:
+    """Hash of what, besides the query, defines a MASTER search: the target PDS list,
+    the MASTER executable and the RMSD cut. Used as key of the matches cache.
+    """
+    master, _ = TButil.get_master_exes()
+    _, pds_list = TButil.pds_database()
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update('{0}\n{1}\n{2}\n'.format(master, Path(master).stat().st_mtime, rmsd).encode())
+    fingerprint.update('\n'.join(sorted(pds_list)).encode())
+    return fingerprint.hexdigest()
+
+
+def cache_link( cached: Path, target: Path ) -> bool:
+    """Link a cached search file to its expected location.
+
+    :return: :data:`True` if the cached file existed and was linked.
+    """
+    # A link left by a previous run must go even on a miss: regenerating the file
+    # through it would overwrite the cache entry of another query.
+    if target.is_symlink():
+        target.unlink()
+    if TBcore.get_option('system', 'forced') or not cached.is_file():
+        return False
+    if target.is_file():
+        target.unlink()
+    target.symlink_to(cached.resolve())
+    if TBcore.get_option('system', 'verbose'):
+        sys.stdout.write('CACHE: Reusing {} as {}\n'.format(cached, target))
+    return True
+
+
+def cache_store( filename: Path, cached: Path ):
+    """Keep a copy of a search file in the cache, unless it is already there.
+    """
+    filename = Path(filename)
+    if cached.is_file() or filename.is_symlink() or not filename.is_file():
+        return
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(str(filename), str(cached))
+
+
 def submit_searches( cmd: List[str], wdir: Path, current_case_file: Path, current_sse: str ) -> Dict:
     """
     """
@@ -146,7 +223,9 @@ def submit_searches( cmd: List[str], wdir: Path, current_case_file: Path, curren
     if unimaster.is_file() and unidata.is_file():
         return {'matches': unimaster, 'stats': unidata, 'corrections': None,
                 'layers': list(set([x[0] for x in current_sse.split('.')]))}
-    if not TBcore.get_option('slurm', 'use'):
+    if unimaster.is_file():
+        analyze_matches(current_case_file, current_sse, unimaster, imaster, unidata.with_suffix(''))
+    elif not TBcore.get_option('slurm', 'use'):
         no_slurm(cmd, current_case_file, current_sse, unimaster, imaster, unidata.with_suffix(''))
     else:
         with_slurm(cmd, current_case_file, current_sse, unimaster, imaster, unidata)
@@ -170,19 +249,15 @@ def calc_corrections( data: Dict, case: Case, qlayers: Set, dlayers: Set,
     elif len(toreference) == 0:
         toreference = None
     else:
-        for x in toreference:
-            found = False
-            if abs(ascii_uppercase.find(x) - ascii_uppercase.find(tocorrect)) == 1:
-                toreference = x
-                found = True
-                break
-            if not found:
-                toreference = None
+        closest = min(toreference, key=lambda x: abs(_LAYER_IDX[x] - _LAYER_IDX[tocorrect]))
+        toreference = closest if abs(_LAYER_IDX[closest] - _LAYER_IDX[tocorrect]) == 1 else None
 
     # Load Data, bin, show and addapt if no matches for the given bin.
-    bins = ["close", "mid", "far", "extreme"]
-    df = pd.read_csv(data['stats'])
-    df = df.assign(bin=pd.cut(df['rmsd'], bins=[0, 2, 2.5, 3, 5], labels=bins))
+    bins = _RMSD_LABELS
+    header = pd.read_csv(data['stats'], nrows=0).columns
+    usecols = [c for c in header if c in _STATS_DTYPES or c.startswith(('angles_', 'points_'))]
+    df = pd.read_csv(data['stats'], usecols=usecols, dtype=_STATS_DTYPES, engine='c')
+    df = df.assign(bin=pd.cut(df['rmsd'], bins=_RMSD_BINS, labels=bins))
     _, _, isBin = TButil.plot_match_bin(df, Path(data['stats']).parent.joinpath('match_count'),
                                         len(TButil.pds_database()[1]), ['pdb', 'chain'])
     while not isBin[bin]:
@@ -195,11 +270,12 @@ def calc_corrections( data: Dict, case: Case, qlayers: Set, dlayers: Set,
         bin = bins[binInt]
         data['bin'] = bin
 
+    layer_types = {layer: case.get_type_for_layer(layer) for layer in qlayers}
     if toreference is None:
-        if case.get_type_for_layer(tocorrect) == 'E':
+        if layer_types[tocorrect] == 'E':
             data['corrections'] = first_layer_beta_correction(df, bin, Path(data['stats']).parent)
-    elif case.get_type_for_layer(toreference) == 'E':
-        if case.get_type_for_layer(tocorrect) == 'H':
+    elif layer_types[toreference] == 'E':
+        if layer_types[tocorrect] == 'H':
             data['corrections'], data['prefixes'] = alpha_on_beta_correction(df, bin, Path(data['stats']).parent, tocorrect, toreference, case, extras)
 
     if TBcore.get_option('system', 'verbose'):
@@ -216,12 +292,11 @@ def alpha_on_beta_correction(df: pd.DataFrame, bin: str, wdir: Path, qlayer: str
     clms = ['measure', 'layer', 'sse', bin]
     stats = stats[(stats['layer'] == rlayer)][clms]
     extras = extras[(extras['layer'] == rlayer)]
-    for layer in sorted(df.layer.unique()):
-        ofile = 'geometric_distributions_layer{}'.format(layer)
-        TButil.plot_geometric_distributions(df[df['layer'] == layer], Path(wdir).joinpath(ofile))
+    plot_layer_distributions(df, wdir)
 
     data = {}
     preref = {'angles_layer': 0, 'angles_side': 0}
+    abdist = case['configuration.defaults.distance.ab']
     for sse in [x for x in stats.sse.unique() if x.startswith(qlayer)]:
         ddf = stats[(stats['sse'] == sse)]
         ddx = extras[(extras['sse'] == sse)]
@@ -229,8 +304,8 @@ def alpha_on_beta_correction(df: pd.DataFrame, bin: str, wdir: Path, qlayer: str
         preref['angles_side'] = -ddx['angles_side'].values[0]
         data.setdefault(sse, {}).setdefault('tilt', {'x': ddf[ddf['measure'] == 'angles_layer'][bin].values[0] + preref['angles_layer'],
                                                      'z': ddf[ddf['measure'] == 'angles_side'][bin].values[0] + preref['angles_side']})
-        pc = ddf[ddf['measure'] == 'points_layer'][bin].values[0] - case['configuration.defaults.distance.ab']
-        if ascii_uppercase.index(qlayer) < ascii_uppercase.index(rlayer):
+        pc = ddf[ddf['measure'] == 'points_layer'][bin].values[0] - abdist
+        if _LAYER_IDX[qlayer] < _LAYER_IDX[rlayer]:
             pc = pc * -1
 
         data.setdefault(sse, {}).setdefault('coordinates', {'z': pc})
@@ -242,38 +317,21 @@ def first_layer_beta_correction( df: pd.DataFrame, bin: str, wdir: Path ) -> Dic
     """
     # Report data
     make_mode_stats(df, wdir)
-    for layer in sorted(df.layer.unique()):
-        ofile = 'geometric_distributions_layer{}'.format(layer)
-        TButil.plot_geometric_distributions(df[df['layer'] == layer], Path(wdir).joinpath(ofile))
-
-    # Make network
-    def reshape(df):
-        def reshape(g):
-            g = g.drop(columns=['pdb', 'chain']).T
-            g = g.rename(columns=g.loc['sse'])
-            g = g.reindex(g.index.drop('sse'))
-            g = g.assign(bin=g.loc['bin'].values[0])
-            g = g.assign(A0E=0)
-            g = g.drop(index='bin')
-            return g
-
-        df = df.copy()[['pdb', 'chain', 'angles_layer', 'sse', 'bin']]
-        bins = list(range(-100, 105, 5))
-        labels = list(np.arange(-97.5, 100, 5))
-        df = df.assign(anglebin=pd.cut(df['angles_layer'], bins=bins, labels=labels))
-        df = df.drop(columns=['angles_layer']).groupby(['pdb', 'chain']).apply(reshape)
-        df.index = list(range(df.shape[0]))
-        return df.drop(columns=['bin'])
-    ddf = reshape(df[df['bin'] == bin])
+    plot_layer_distributions(df, wdir)
+
+    # Make network: one row per match with the angle bin of each SSE.
+    ddf = df[df['bin'] == bin]
+    ddf = ddf.assign(anglebin=pd.cut(ddf['angles_layer'], bins=_ANGLE_BINS, labels=_ANGLE_LABELS).astype(float))
+    ddf = ddf.pivot_table(index=['pdb', 'chain'], columns='sse', values='anglebin', aggfunc='first')
+    ddf = ddf.reset_index(drop=True).assign(A0E=0)
     sses = sorted(list(ddf.columns))
     netwk = []
     for i in range(0, len(sses) - 1):
         idx = [sses[i], sses[i + 1]]
-        tmp = pd.DataFrame(ddf.groupby(idx).size()).rename(columns={0: 'count'}).reset_index()
-        netwk.append(tmp.reset_index())
-        netwk[-1][idx[0]] = netwk[-1][idx[0]].apply(lambda v: "_".join([idx[0], str(v)]))
-        netwk[-1][idx[1]] = netwk[-1][idx[1]].apply(lambda v: "_".join([idx[1], str(v)]))
-        netwk[-1] = nx.from_pandas_edgelist(netwk[-1], idx[0], idx[1], ['count'], create_using=nx.DiGraph)
+        tmp = ddf[idx].value_counts(sort=False).rename('count').reset_index()
+        tmp[idx[0]] = idx[0] + '_' + tmp[idx[0]].astype(str)
+        tmp[idx[1]] = idx[1] + '_' + tmp[idx[1]].astype(str)
+        netwk.append(nx.from_pandas_edgelist(tmp, idx[0], idx[1], ['count'], create_using=nx.DiGraph))
 
     posk = {}
     try:
@@ -298,37 +356,59 @@ def first_layer_beta_correction( df: pd.DataFrame, bin: str, wdir: Path ) -> Dic
     return data
 
 
+def plot_layer_distributions( df: pd.DataFrame, wdir: Path ):
+    """Plot the geometric distributions of each layer, unless plots are disabled.
+    """
+    if not TBcore.get_option('system', 'plots'):
+        return
+    for layer in sorted(df.layer.unique()):
+        ofile = 'geometric_distributions_layer{}'.format(layer)
+        fig, _ = TButil.plot_geometric_distributions(df[df['layer'] == layer], Path(wdir).joinpath(ofile))
+        if not TBcore.get_option('system', 'jupyter'):
+            plt.close(fig)
+
+
 def make_mode_stats( df: pd.DataFrame, wdir: Path ) -> pd.DataFrame:
     """
     """
-    data = {'close': [], 'mid': [], 'far': [], 'extreme': []}
-    topi, midi, boti = [], [], []
-
-    for angle in [x for x in df.columns if x.startswith('angles_') or x.startswith('points_')]:
-        for part in ['close', 'mid', 'far', 'extreme']:
-            dfp = df[df['bin'] == part]
-            for lay in df.layer.unique():
-                for sse in df.sse.unique():
-                    dfs = dfp[(dfp['sse'] == sse) & (dfp['layer'] == lay)]
-                    try:
-                        kde = sc.stats.gaussian_kde(dfs[angle])
-                        x = np.linspace(dfs[angle].min(), dfs[angle].max(), 200)
-                        kde = kde(x)
-                        mode = x[np.argsort(kde)[-1]]
-                    except ValueError:
-                        mode = 0
-                    data[part].append(mode)
-                    if part == 'close':
-                        topi.append(angle)
-                        midi.append(lay)
-                        boti.append(sse)
-    stats = pd.DataFrame(data, index=pd.MultiIndex.from_tuples(list(zip(*[topi, midi, boti])),
-                                                               names=['measure', 'layer', 'sse']))
+    bins = _RMSD_LABELS
+    measures = [x for x in df.columns if x.startswith('angles_') or x.startswith('points_')]
+
+    # One KDE per populated (measure, layer, sse, bin) group.
+    dfl = df.melt(id_vars=['bin', 'layer', 'sse'], value_vars=measures, var_name='measure')
+    stats = dfl.groupby(['measure', 'layer', 'sse', 'bin'], observed=True, sort=False)['value'].apply(kde_mode)
+    stats = stats.unstack('bin')
+    stats.columns = list(stats.columns)
+
+    # Empty groups are reported with a mode of 0.
+    index = pd.MultiIndex.from_product([measures, df.layer.unique(), df.sse.unique()],
+                                       names=['measure', 'layer', 'sse'])
+    stats = stats.reindex(index=index, columns=bins).fillna(0)
+
     stats.reset_index().to_csv(wdir.joinpath('mode_stats.csv'), index=False)
     TButil.plugin_filemaker('Mode stats stored at {}'.format(wdir.joinpath('mode_stats.csv')))
     return stats
 
 
+def kde_mode( values: pd.Series ) -> float:
+    """Mode of the gaussian KDE of a set of values (0 if it cannot be calculated).
+    """
+    # Less than two distinct values make a singular KDE.
+    if values.size < 2 or values.min() == values.max():
+        return 0
+    # Same estimate as scipy's gaussian_kde (Scott's bandwidth), without building a KDE
+    # object per group. Normalization does not change the argmax.
+    values = values.to_numpy(dtype=float)
+    bandwidth = values.std(ddof=1) * values.size ** (-1. / 5)
+    x = np.linspace(values.min(), values.max(), 200)
+    # Values are evaluated in blocks, so memory stays bounded for large groups.
+    density = np.zeros_like(x)
+    for i in range(0, values.size, _KDE_BLOCK):
+        block = (x[:, None] - values[None, i:i + _KDE_BLOCK]) / bandwidth
+        density += np.exp(-0.5 * block * block).sum(axis=1)
+    return x[np.argsort(density)[-1]]
+
+
 def with_slurm( cmd: List[str],
                 current_case_file: Path,
                 current_sse: str,
@@ -369,12 +449,12 @@ def with_slurm( cmd: List[str],
     TButil.submit_slurm(unimaster.parent.joinpath('submit.sh').relative_to(wwd))
     TButil.plugin_filemaker('Creating geometric coordinate file {}'.format(unidata))
     allCSV = [str(x) for x in unimaster.parent.relative_to(wwd).glob('_*.geo.csv')]
-    pd.concat([pd.read_csv(x) for x in allCSV]).to_csv(unidata.relative_to(wwd), index=False)
+    TButil.concat_csv_files(allCSV, unidata.relative_to(wwd))
     TButil.plugin_filemaker('Creating MASTER search file {}'.format(unimaster))
-    with unimaster.relative_to(wwd).open('w') as fd:
+    with unimaster.relative_to(wwd).open('wb') as fd:
         for x in unimaster.parent.glob('_*.master'):
-            with x.relative_to(wwd).open() as fi:
-                fd.write(''.join(fi.readlines()))
+            with x.relative_to(wwd).open('rb') as fi:
+                shutil.copyfileobj(fi, fd, 1 << 20)
     os.chdir(str(cwd))
 
 
@@ -386,22 +466,31 @@ def no_slurm( cmd: List[str],
               unidata: Path ):
     """
     """
-    # Search on MASTER
-    result = []
-    for com in cmd:
-        TButil.plugin_bash(com)
-        run(com, stdout=DEVNULL)
-        outf = Path(com[-1])
-        if outf.is_file():
-            result.append(str(outf))
-    result.insert(0, 'cat')
+    # Search on MASTER (searches against each target are independent).
+    # Each MASTER process loads its targets, so how many run at once is capped by master.jobs.
+    TButil.plugin_bash(cmd)
+    with ThreadPoolExecutor(max_workers=max(1, TBcore.get_option('master', 'jobs'))) as executor:
+        list(executor.map(lambda com: run(com, stdout=DEVNULL), cmd))
+    result = [com[-1] for com in cmd if Path(com[-1]).is_file()]
     TButil.plugin_filemaker('Unify matches at {0}'.format(unimaster))
-    with unimaster.open('w') as fd:
-        run(result, stdout=fd)
-    result[0] = 'rm'
-    run(result[:-2], stdout=DEVNULL)
+    with unimaster.open('wb') as fd:
+        for x in result:
+            with open(x, 'rb') as fi:
+                shutil.copyfileobj(fi, fd, 1 << 20)
+    for x in result:
+        Path(x).unlink()
 
     # Analyze
+    analyze_matches(current_case_file, current_sse, unimaster, imaster, unidata)
+
+
+def analyze_matches( current_case_file: Path,
+                     current_sse: str,
+                     unimaster: Path,
+                     imaster: Path,
+                     unidata: Path ):
+    """
+    """
     createbash = 'python {0} -case {1} -master {2} -present {3} -out {4}'
     cmd = shlex.split(createbash.format(imaster, current_case_file, unimaster, current_sse, unidata))
     TButil.plugin_bash(cmd)
@@ -77,8 +77,7 @@ def apply( cases: List[Case],
 def case_apply( case: Case, ranger: Dict ) -> List[Case]:
     """
     """
-    case = Case(case)
-
+    # Only the name of the input case is used: no need to copy it.
     todo = []
     for i, layer in enumerate(ranger):
         sse, rng = layer.split('.')
@@ -90,7 +89,6 @@ def case_apply( case: Case, ranger: Dict ) -> List[Case]:
     def empties( lst ):
         return [x for x in lst if not x.startswith('0')]
 
-    new_cases = []
-    for architecture in map(empties, itertools.product(*todo)):
-        new_cases.append(Case(case.name).add_architecture('.'.join(architecture)))
-    return new_cases
+    # add_architecture returns a new Case, so the empty base can be shared.
+    base = Case(case.name)
+    return [base.add_architecture('.'.join(architecture)) for architecture in map(empties, itertools.product(*todo))]
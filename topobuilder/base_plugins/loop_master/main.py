@@ -10,22 +10,26 @@
 import os
 import sys
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 import math
-from tempfile import NamedTemporaryFile
+import tempfile
+import hashlib
 import shlex
-from ast import literal_eval
-from subprocess import run
+from subprocess import run, DEVNULL
+from concurrent.futures import ThreadPoolExecutor
 import gzip
+import json
 import itertools
+from functools import lru_cache
 
 
 # External Libraries
+import numpy as np
 import pandas as pd
-from pandas.compat import StringIO
-from SBI.structure import PDB, PDBFrame, ChainFrame
-import SBI.structure.geometry as SBIgeo
+import matplotlib.pyplot as plt
+from SBI.structure import PDB, PDBFrame
 from rstoolbox.io import parse_rosetta_fragments, write_rosetta_fragments
+from rstoolbox.components import FragmentFrame
 
 # This Library
 from topobuilder.case import Case
@@ -53,19 +57,15 @@ def apply( cases: List[Case],
         sys.stdout.write('--- TB PLUGIN: LOOP_MASTER ---\n')
 
     # Get list of PDS structures
-    tempdb = False
     database = core.get_option('master', 'pds')
     database = Path(database)
     if database.is_file():
         pass
     elif database.is_dir():
-        f = NamedTemporaryFile(mode='w', delete=False)
+        # Kept in the project folder of the cases, which belongs to the current user.
+        database = pds_list_file(database, cases[0].main_path.joinpath('loop_master') if cases else Path.cwd())
         if TBcore.get_option('system', 'debug'):
-            sys.stdout.write('Temporary file for PDS database: {}\n'.format(f.name))
-        [f.write(str(x.resolve()) + '\n') for x in database.glob('*/*.pds')]
-        f.close()
-        database = Path(f.name)
-        tempdb = True
+            sys.stdout.write('File for PDS database: {}\n'.format(database))
     else:
         raise ValueError('The provided MASTER database directory/list file cannot be found.')
 
@@ -76,15 +76,17 @@ def apply( cases: List[Case],
     fragfiles = get_fragfiles()
 
     # Execute for each case
+    # MASTER searches of all cases are pooled; everything else runs case by case.
+    plans = []
     for i, case in enumerate(cases):
         cases[i].data.setdefault('metadata', {}).setdefault('loop_fragments', [])
         cases[i].data.setdefault('metadata', {}).setdefault('loop_lengths', [])
-        cases[i] = case_apply(case, database, loop_range, top_loops, rmsd_cut, abegodata, harpins_2, fragfiles)
+        plans.append(plan_loops(case, database, loop_range, top_loops, rmsd_cut))
+    search_loops(plans, database)
+    for i, plan in enumerate(plans):
+        cases[i] = collect_loops(plan, abegodata, fragfiles, top_loops, harpins_2)
         cases[i] = cases[i].set_protocol_done(prtid)
 
-    if tempdb:
-        os.unlink(f.name)
-
     return cases
 
 
@@ -98,6 +100,14 @@ def case_apply( case: Case,
                 fragfiles: pd.DataFrame ) -> str:
     """
     """
+    plan = plan_loops(case, pds_list, loop_range, top_loops, rmsd_cut)
+    search_loops([plan], pds_list)
+    return collect_loops(plan, abego, fragfiles, top_loops, harpins_2)
+
+
+def plan_loops( case: Case, pds_list: Path, loop_range: int, top_loops: int, rmsd_cut: float ) -> Dict:
+    """Build the case and its loop queries, and find which loop steps still need a MASTER search.
+    """
     # Loop MASTER is only applied to a Case with one single connectivity and already reoriented
     if case.connectivity_count > 1:
         raise ValueError('Loop MASTER can only be applied to one connectivity.')
@@ -115,44 +125,83 @@ def case_apply( case: Case,
     it = case.connectivities_str[0].split('.')
     steps = [it[i:i + 2] for i in range(0, len(it) - 1)]
     loop_step = case.cast_absolute()['configuration.defaults.distance.loop_step']
-    lengths = case.connectivity_len[0]
-    start = 1
 
+    # 1. Make folders and files; 2. Check if checkpoint exists
+    workplan = []
     for i, sse in enumerate(steps):
-        # 1. Make folders and files
         wfolder = folders.joinpath('loop{:02d}'.format(i + 1))
         wfolder.mkdir(parents=True, exist_ok=True)
         outfile = wfolder.joinpath('loop_master.jump{:02d}.pdb'.format(i + 1))
-        masfile = outfile.with_suffix('.master')
         checkpoint = wfolder.joinpath('checkpoint.json')
+        workplan.append((sse, outfile, checkpoint, TButil.checkpoint_in(checkpoint)))
+
+    # 3. Generate structures. Finished MASTER searches are reused only if done with the
+    # same search parameters, over the same targets and for the same query structure.
+    params = {'rmsd_cut': rmsd_cut, 'top_loops': top_loops, 'multiplier': 3,
+              'loop_range': loop_range, 'loop_step': loop_step,
+              'targets': file_checksum(str(pds_list), *file_signature(pds_list))}
+    pending = []
+    match_counts = {}
+    pdbs = {}  # Each secondary structure is built once, even if shared by two steps.
+    for i, (sse, outfile, _, reload) in enumerate(workplan):
+        if reload is not None:
+            continue
+        for sse_id in sse:
+            if sse_id not in pdbs:
+                pdbs[sse_id] = sse_to_pdb(case.get_sse_by_id(sse_id))
+        sse1, sse2, query = make_structure(pdbs[sse[0]], pdbs[sse[1]], outfile)
+        stepparams = dict(params, query=query)
+        done = master_done(outfile.with_suffix('.master'), stepparams)
+        if done is None:
+            pending.append((i, outfile, sse1, sse2, stepparams))
+        else:
+            match_counts[i] = done['match_count']
+
+    return {'case': case, 'workplan': workplan, 'params': params, 'pending': pending, 'match_counts': match_counts}
+
+
+def search_loops( plans: List[Dict], pds_list: Path ):
+    """Run the pending MASTER searches of all the plans, filling their match counts.
+    """
+    # 4-6. MASTER searches are independent between steps (and cases): run them concurrently.
+    # Threads suffice as the work is done by the createPDS/MASTER subprocesses.
+    jobs = []
+    for plan in plans:
+        for i, outfile, sse1, sse2, params in plan['pending']:
+            jobs.append((plan, i, (sse1, sse2, outfile, pds_list, params)))
+    if len(jobs) == 0:
+        return
+
+    # Each MASTER process loads the whole target list, so how many run at once is capped by master.jobs.
+    with ThreadPoolExecutor(max_workers=min(len(jobs), max(1, TBcore.get_option('master', 'jobs')))) as executor:
+        futures = [(plan, i, executor.submit(search_loop, *args)) for plan, i, args in jobs]
+    for plan, i, future in futures:
+        plan['match_counts'][i] = future.result()
+
+
+def collect_loops( plan: Dict, abego: pd.DataFrame, fragfiles: pd.DataFrame,
+                   top_loops: int, harpins_2: bool ) -> Case:
+    """Pick the loops from the MASTER searches of a plan and make their fragments.
+    """
+    case = plan['case']
+    lengths = case.connectivity_len[0]
+    start = 1
+    debug = TBcore.get_option('system', 'debug')
 
-        # 2. Check if checkpoint exists, retrieve and skip
-        reload = TButil.checkpoint_in(checkpoint)
+    for i, (sse, outfile, checkpoint, reload) in enumerate(plan['workplan']):
+        masfile = outfile.with_suffix('.master')
+
+        # Retrieve checkpointed data and skip
         if reload is not None:
             case.data['metadata']['loop_fragments'].append(reload)
             case.data['metadata']['loop_lengths'].append(int(reload['edges']['loop']))
             start += (int(reload['edges']['sse1']) + int(reload['edges']['loop']))
             continue
 
-        # 2. Check hairpin
-        sse1 = case.get_sse_by_id(sse[0])
-        sse1_name = sse1['id']
-        sse2 = case.get_sse_by_id(sse[1])
-        sse2_name = sse2['id']
+        # Check hairpin
+        sse1_name, sse2_name = sse
         is_hairpin = check_hairpin(sse1_name, sse2_name)
-
-        if not masfile.is_file():
-            # 3. Generate structures
-            sse1, sse2 = make_structure(sse1, sse2, outfile)
-
-            # 4. calculate expected loop length by loop_step
-            Mdis, mdis = get_loop_length(sse1, sse2, loop_step, loop_range)
-
-            # 5. Run master
-            execute_master_fixedgap(outfile, pds_list, mdis, Mdis, rmsd_cut)
-
-            # 6. Minimize master data (pick top_loopsx3 lines to read and minimize the files)
-            match_count = minimize_master_file(masfile, top_loops, 3)
+        match_count = plan['match_counts'].get(i, 0)
 
         # 7. Retrieve master data
         dfloop = process_master_data(masfile, sse1_name, sse2_name, abego, fragfiles, top_loops, is_hairpin and harpins_2)
@@ -160,7 +209,7 @@ def case_apply( case: Case,
         total_len = sse1l + loopl + sse2l
         end_edge = total_len + start - 1
         edges = {'ini': int(start), 'end': int(end_edge), 'sse1': int(sse1l), 'loop': int(loopl), 'sse2': int(sse2l)}
-        if TBcore.get_option('system', 'debug'):
+        if debug:
             sys.stdout.write('\nINI: {}; END: {}; SSE1: {}; LOOP: {}; SSE2: {}\n\n'.format(start, end_edge, sse1l, loopl, sse2l))
             sys.stdout.write(dfloop.to_string() + '\n')
 
@@ -184,17 +233,28 @@ def make_fragment_files( dfloop: pd.DataFrame, edges: Dict, masfile: Path ) -> D
     data = {'loop_length': int(dfloop.iloc[0]['loop_length']), 'abego': list(dfloop['loop'].values),
             'edges': edges, 'fragfiles': [], 'match_count': 0}
 
-    dfs3 = []
-    dfs9 = []
     sample = math.ceil(200 / dfloop.shape[0])
-    for i, row in dfloop.iterrows():
+
+    # The same PDB chain is often picked for several loops: each fragment file is parsed
+    # once for this loop only, so nothing is kept in memory after it.
+    sources = ['{}_{}'.format(pdb, chain) for pdb, chain in zip(dfloop['pdb'], dfloop['chain'])]
+    files3 = [(str(x), src) for x, src in zip(dfloop['3mers'], sources)]
+    files9 = [(str(x), src) for x, src in zip(dfloop['9mers'], sources)]
+    unique = list(dict.fromkeys(files3 + files9))
+
+    # Fragment files are gzipped; decompression of the different files can overlap.
+    with ThreadPoolExecutor(max_workers=min(8, len(unique))) as executor:
+        parsed = dict(zip(unique, executor.map(lambda x: parse_rosetta_fragments(x[0], source=x[1]), unique)))
+
+    def cut( fragfile: Tuple[str, str], match: List ) -> FragmentFrame:
         # Remember: MASTER match starts with 0!
-        dfs3.append((parse_rosetta_fragments(str(row['3mers']), source='{}_{}'.format(row['pdb'], row['chain']))
-                     .slice_region(row['match'][0][0] + 1, row['match'][1][1] + 1).sample_top_neighbors(sample)
-                     .renumber(edges['ini']).top_limit(edges['end'])))
-        dfs9.append((parse_rosetta_fragments(str(row['9mers']), source='{}_{}'.format(row['pdb'], row['chain']))
-                     .slice_region(row['match'][0][0] + 1, row['match'][1][1] + 1).sample_top_neighbors(sample)
-                     .renumber(edges['ini']).top_limit(edges['end'])))
+        return (parsed[fragfile].copy()
+                .slice_region(match[0][0] + 1, match[1][1] + 1).sample_top_neighbors(sample)
+                .renumber(edges['ini']).top_limit(edges['end']))
+
+    dfs3 = [cut(x, match) for x, match in zip(files3, dfloop['match'])]
+    dfs9 = [cut(x, match) for x, match in zip(files9, dfloop['match'])]
+    del parsed
 
     # Merge Fragments
     dfs3all = dfs3[0]
@@ -205,26 +265,70 @@ def make_fragment_files( dfloop: pd.DataFrame, edges: Dict, masfile: Path ) -> D
     dfs3all = dfs3all.sample_top_neighbors(200)
     dfs9all = dfs9all.sample_top_neighbors(200)
 
-    if TBcore.get_option('system', 'debug'):
+    debug = TBcore.get_option('system', 'debug')
+    if debug:
         sys.stdout.write('Writing 3mers fragfile\n')
     data['fragfiles'].append(write_rosetta_fragments(dfs3all, prefix=str(masfile.with_suffix('')), strict=True))
-    if TBcore.get_option('system', 'debug'):
+    if debug:
         sys.stdout.write('3mers fragfile: {}\n'.format(data['fragfiles'][-1]))
         sys.stdout.write('Writing 9mers fragfile\n')
     data['fragfiles'].append(write_rosetta_fragments(dfs9all, prefix=str(masfile.with_suffix('')), strict=True))
-    if TBcore.get_option('system', 'debug'):
+    if debug:
         sys.stdout.write('9mers fragfile: {}\n'.format(data['fragfiles'][-1]))
 
-    dfs3all.drop(columns=['pdb', 'frame', 'neighbors', 'neighbor',
-                          'aa', 'sse', 'phi', 'psi', 'omega']).to_csv(data['fragfiles'][0] + '.csv', index=False)
-    dfs9all.drop(columns=['pdb', 'frame', 'neighbors', 'neighbor',
-                          'aa', 'sse', 'phi', 'psi', 'omega']).to_csv(data['fragfiles'][1] + '.csv', index=False)
-    imageprefix = masfile.with_suffix('.fragprofile')
-    TButil.plot_fragment_templates(dfs3all, dfs9all, imageprefix)
+    skip = {'pdb', 'frame', 'neighbors', 'neighbor', 'aa', 'sse', 'phi', 'psi', 'omega'}
+    for dfsall, fragfile in zip([dfs3all, dfs9all], data['fragfiles']):
+        dfsall.to_csv(fragfile + '.csv', columns=[c for c in dfsall.columns if c not in skip],
+                      index=False, chunksize=100000)
+    if TBcore.get_option('system', 'plots'):
+        fig, _ = TButil.plot_fragment_templates(dfs3all, dfs9all, masfile.with_suffix('.fragprofile'))
+        if not TBcore.get_option('system', 'jupyter'):
+            plt.close(fig)
 
     return data
 
 
+def file_signature( filename: Path ) -> Tuple[float, int]:
+    """Modification time and size of a file, to key the cache of its checksum.
+    """
+    stat = Path(filename).stat()
+    return stat.st_mtime, stat.st_size
+
+
+@lru_cache(maxsize=8)
+def file_checksum( filename: str, mtime: float, size: int ) -> str:
+    """SHA-1 of a file content (the PDS list can be large, so it is hashed once per version).
+    """
+    checksum = hashlib.sha1()
+    with open(filename, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(1 << 20), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def pds_list_file( database: Path, folder: Path ) -> Path:
+    """Write the list of PDS files of a database directory for MASTER's ``--targetList``.
+
+    The file is named after a checksum of its content and kept in ``folder``, so later
+    runs over the same database reuse it instead of rewriting it. An existing file is
+    only reused if its content still matches that checksum.
+    """
+    pds = TButil.list_pds_database(str(database), database.stat().st_mtime)
+    content = ''.join(x + '\n' for x in sorted(pds)).encode()
+    checksum = hashlib.sha1(content).hexdigest()
+    folder.mkdir(parents=True, exist_ok=True)
+    listfile = folder.joinpath('pdslist_{}.txt'.format(checksum[:12]))
+    if listfile.is_file() and file_checksum(str(listfile), *file_signature(listfile)) == checksum:
+        return listfile
+
+    # Written aside and renamed, so a concurrent run never reads a partial list.
+    fd, tmpname = tempfile.mkstemp(prefix='.{}.'.format(listfile.name), dir=str(listfile.parent))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(tmpname, str(listfile))
+    return listfile
+
+
 def get_fragfiles():
     """
     """
@@ -233,9 +337,33 @@ def get_fragfiles():
         sys.stdout.write('Listing available fragment files at: {}\n'.format(fragpath.name))
     if not fragpath.is_dir():
         raise IOError('MASTER fragments folder cannot be found.')
-    return pd.DataFrame([(x.name[:4], x.name[5:6], x, y) for x, y in zip(sorted(fragpath.glob('*/*3mers.gz')),
-                                                                         sorted(fragpath.glob('*/*9mers.gz')))],
-                        columns=['pdb', 'chain', '3mers', '9mers'])
+    return list_fragfiles(str(fragpath), fragpath.stat().st_mtime)
+
+
+@lru_cache(maxsize=4)
+def list_fragfiles( fragpath: str, mtime: float ) -> pd.DataFrame:
+    """List the 3mers and 9mers fragment files of each PDB chain.
+
+    :param str fragpath: Path to the MASTER fragments folder.
+    :param float mtime: Modification time of ``fragpath``. It is only used as part
+        of the cache key, so that a modified folder is listed again.
+
+    :return: :class:`~pandas.DataFrame` indexed by ``pdb`` and ``chain``, shared
+        between calls; do not modify in place.
+    """
+    # Single walk, pairing the 3mers and 9mers files of each chain by name.
+    pairs = {}
+    for sub in os.scandir(fragpath):
+        if not sub.is_dir():
+            continue
+        for fragfile in os.scandir(sub.path):
+            for kind in ('3mers', '9mers'):
+                if fragfile.name.endswith(kind + '.gz'):
+                    key = (fragfile.name[:4], fragfile.name[5:6])
+                    pairs.setdefault(key, {})[kind] = Path(fragfile.path)
+    return pd.DataFrame(sorted([(k[0], k[1], v['3mers'], v['9mers']) for k, v in pairs.items() if len(v) == 2],
+                               key=lambda x: x[2]),
+                        columns=['pdb', 'chain', '3mers', '9mers']).set_index(['pdb', 'chain'])
 
 
 def get_abegos():
@@ -248,47 +376,75 @@ def get_abegos():
 
     if TBcore.get_option('system', 'debug'):
         sys.stdout.write('Loading ABEGO data from: {}\n'.format(abegos.name))
+    return parse_abegos(str(abegos), abegos.stat().st_mtime)
+
+
+@lru_cache(maxsize=4)
+def parse_abegos( abegos: str, mtime: float ) -> pd.DataFrame:
+    """Load the ABEGO string of each PDB chain from a (gzipped) FASTA file.
+
+    :param str abegos: Path to the ABEGO FASTA file.
+    :param float mtime: Modification time of ``abegos``. It is only used as part
+        of the cache key, so that a modified file is parsed again.
+
+    :return: :class:`~pandas.DataFrame` indexed by ``pdb`` and ``chain``, shared
+        between calls; do not modify in place.
+    """
+    abegos = Path(abegos)
     doopen = gzip.open if abegos.suffix == '.gz' else open
-    abegodata = []
     with doopen(abegos, 'rt') as fd:
-        for line1, line2 in itertools.zip_longest(*[fd] * 2):
-            line2 = line2 if len(line2.strip()) != 0 else 'NON\n'
-            line1 = line1.strip().lstrip('>').split('_')
-            abegodata.append('{},{},{}'.format(line1[0], line1[1], line2))
-    abegodata = pd.read_csv(StringIO(''.join(abegodata)), names=['pdb', 'chain', 'abego'], header=None)
-    abegodata = abegodata[abegodata['abego'] != 'NON']
+        lines = fd.read().splitlines()
+    # Header and ABEGO lines alternate; a missing last ABEGO line counts as empty.
+    headers = pd.Series(lines[0::2]).str.strip().str.lstrip('>').str.split('_')
+    abegodata = pd.Series(lines[1::2], dtype=str).reindex(headers.index, fill_value='').str.strip()
+    abegodata = pd.DataFrame({'pdb': headers.str[0], 'chain': headers.str[1], 'abego': abegodata})
+    abegodata = abegodata[abegodata['abego'].str.len() > 0]
 
-    return abegodata
+    return abegodata.set_index(['pdb', 'chain'])
 
 
-def make_structure(sse1: dict, sse2: dict, outfile: Path) -> Tuple[PDBFrame, PDBFrame]:
+def sse_to_pdb( sse: dict ) -> PDBFrame:
     """
     """
-    sse1 = PDB(pd.DataFrame(sse1['metadata']['atoms'],
+    return PDB(pd.DataFrame(sse['metadata']['atoms'],
                             columns=['auth_comp_id', 'auth_atom_id', 'auth_seq_id',
-                                     'Cartn_x', 'Cartn_y', 'Cartn_z'])).renumber(1)
+                                     'Cartn_x', 'Cartn_y', 'Cartn_z']))
 
-    sse2 = PDB(pd.DataFrame(sse2['metadata']['atoms'],
-                            columns=['auth_comp_id', 'auth_atom_id', 'auth_seq_id',
-                                     'Cartn_x', 'Cartn_y', 'Cartn_z'])).renumber(sse1.iloc[-1]['auth_seq_id'] + 5)
-    structure = pd.concat([sse1, sse2])
-    structure['id'] = list(range(1, structure.shape[0] + 1))
+
+def make_structure(sse1: PDBFrame, sse2: PDBFrame, outfile: Path) -> Tuple[PDBFrame, PDBFrame, str]:
+    """Write the query structure of a loop step.
+
+    The file is only replaced when its content changes.
+
+    :return: Both renumbered secondary structures and the checksum of the query file.
+    """
+    # Consecutive steps share secondary structures: never renumber the given ones.
+    sse1 = sse1.copy().renumber(1)
+    sse2 = sse2.copy().renumber(sse1.iloc[-1]['auth_seq_id'] + 5)
+    structure = pd.concat([sse1, sse2], ignore_index=True)
+    structure['id'] = np.arange(1, structure.shape[0] + 1, dtype=np.int32)
 
     if TBcore.get_option('system', 'verbose'):
         sys.stdout.write('-> generating structure {}\n'.format(outfile.resolve()))
-    structure.write(output_file=str(outfile), format='pdb', clean=True,
-                    force=TBcore.get_option('system', 'overwrite'))
+    newfile = outfile.with_suffix('.new.pdb')
+    structure.write(output_file=str(newfile), format='pdb', clean=True, force=True)
+    content = newfile.read_bytes()
+    if outfile.is_file() and outfile.read_bytes() == content:
+        newfile.unlink()
+    else:
+        os.replace(str(newfile), str(outfile))
 
-    return sse1, sse2
+    return sse1, sse2, hashlib.sha1(content).hexdigest()
 
 
-def get_loop_length(sse1: PDB, sse2: PDB, loop_step: int, loop_range: int) -> Tuple[int, int]:
+def get_loop_length(sse1: PDBFrame, sse2: PDBFrame, loop_step: int, loop_range: int) -> Tuple[int, int]:
     """
     """
-    res1 = ChainFrame(PDB(sse1)).last_compound
-    res2 = ChainFrame(PDB(sse2)).first_compound
-    distance = SBIgeo.point_distance(res1[res1['label_atom_id'] == 'N'].coordinates,
-                                     res2[res2['label_atom_id'] == 'N'].coordinates)
+    # Distance between the backbone N of the last residue of sse1 and the first of sse2.
+    xyz = ['Cartn_x', 'Cartn_y', 'Cartn_z']
+    res1 = sse1[(sse1['auth_seq_id'] == sse1.iloc[-1]['auth_seq_id']) & (sse1['auth_atom_id'] == 'N')]
+    res2 = sse2[(sse2['auth_seq_id'] == sse2.iloc[0]['auth_seq_id']) & (sse2['auth_atom_id'] == 'N')]
+    distance = float(np.linalg.norm(res1[xyz].to_numpy(dtype=float)[0] - res2[xyz].to_numpy(dtype=float)[0]))
     distance = math.ceil(distance / loop_step)
     distance = [x for x in range(distance - loop_range - 1, distance + loop_range + 1) if x > 0]
     return max(distance), min(distance)
@@ -305,43 +461,96 @@ def execute_master_fixedgap(outfile: Path, pds_list: Path, mdis: int, Mdis: int,
     createcmd = shlex.split(createbash.format(createPDS, outfile, outfile.with_suffix('.pds')))
     mastercmd = shlex.split(masterbash.format(master, outfile.with_suffix('.pds'),
                                               pds_list, outfile.with_suffix('.master'), mdis, Mdis, rmsd_cut))
-    if TBcore.get_option('system', 'verbose'):
-        sys.stdout.write('-> Execute: {}\n'.format(' '.join(createcmd)))
-    with open(os.devnull, 'w') as devnull:
-        run(createcmd, stdout=devnull)
-    if TBcore.get_option('system', 'verbose'):
+    # The query PDS only needs to be (re)created if the content of the structure changed.
+    # The structure is rewritten before every search, so its mtime cannot tell that.
+    pdsfile = outfile.with_suffix('.pds')
+    hashfile = outfile.with_suffix('.pds.sha1')
+    checksum = hashlib.sha1(outfile.read_bytes()).hexdigest()
+    verbose = TBcore.get_option('system', 'verbose')
+    if not pdsfile.is_file() or not hashfile.is_file() or hashfile.read_text().strip() != checksum:
+        # A stale PDS must never be paired with the new checksum if createPDS fails.
+        for stale in (pdsfile, hashfile):
+            if stale.is_file():
+                stale.unlink()
+        if verbose:
+            sys.stdout.write('-> Execute: {}\n'.format(' '.join(createcmd)))
+        run(createcmd, stdout=DEVNULL)
+        if pdsfile.is_file():
+            hashfile.write_text(checksum + '\n')
+    if verbose:
         sys.stdout.write('-> Execute: {}\n'.format(' '.join(mastercmd)))
-    with open(os.devnull, 'w') as devnull:
-        run(mastercmd, stdout=devnull)
+    run(mastercmd, stdout=DEVNULL)
 
 
-def minimize_master_file( masfile: Path, top_loops: int, multiplier: int ) -> int:
+def search_loop( sse1: PDBFrame, sse2: PDBFrame, outfile: Path, pds_list: Path, params: Dict ) -> int:
+    """Search with MASTER the loops that can connect two secondary structures.
+
+    :param sse1: First secondary structure, as renumbered by :func:`make_structure`.
+    :param sse2: Second secondary structure, as renumbered by :func:`make_structure`.
+    :param outfile: Query structure written by :func:`make_structure`.
+    :param dict params: Search parameters (``rmsd_cut``, ``top_loops``, ``multiplier``,
+        ``loop_range`` and ``loop_step``) and the checksums of the target list (``targets``)
+        and of the query structure (``query``). They are recorded in a ``.done`` file
+        next to the MASTER output once the search finishes.
+
+    :return: Number of matches found before minimizing the MASTER file.
     """
+    masfile = outfile.with_suffix('.master')
+
+    # 4. calculate expected loop length by loop_step
+    Mdis, mdis = get_loop_length(sse1, sse2, params['loop_step'], params['loop_range'])
+
+    # 5. Run master; data processed from a previous search is not valid anymore.
+    execute_master_fixedgap(outfile, pds_list, mdis, Mdis, params['rmsd_cut'])
+    for stale in (masfile.with_suffix('.csv'), masfile.with_suffix('.all.csv')):
+        if stale.is_file():
+            stale.unlink()
+
+    # 6. Minimize master data (pick top_loopsx3 lines to read and minimize the files)
+    match_count = minimize_master_file(masfile, params['top_loops'], params['multiplier'])
+    with masfile.with_suffix('.done').open('w') as fd:
+        json.dump({'params': params, 'gap': [mdis, Mdis], 'match_count': match_count}, fd)
+    return match_count
+
+
+def master_done( masfile: Path, params: Dict ) -> Optional[Dict]:
+    """Data of a finished (and minimized) MASTER search, if done with the same parameters
+    (including the query and target checksums).
     """
+    donefile = masfile.with_suffix('.done')
+    if TBcore.get_option('system', 'forced') or not masfile.is_file() or not donefile.is_file():
+        return None
     try:
-        with open(masfile) as fd:
-            num_lines = sum(1 for line in fd if line.rstrip())
-        with open(masfile) as fd:
-            head = [next(fd) for x in range(top_loops * multiplier)]
-        with open(masfile, 'w') as fd:
-            fd.write(''.join(head))
-    except StopIteration:
-        pass
-    return num_lines
+        with donefile.open() as fd:
+            done = json.load(fd)
+    except json.JSONDecodeError:
+        return None
+    return done if done.get('params') == params else None
+
+
+def minimize_master_file( masfile: Path, top_loops: int, multiplier: int ) -> int:
+    """
+    """
+    # Keep the head lines, count the rest by newlines in binary chunks (MASTER does not
+    # write empty lines) and cut the file in place after the head.
+    with open(masfile, 'rb+') as fd:
+        head = sum(1 for line in itertools.islice(fd, top_loops * multiplier) if line.strip())
+        cut = fd.tell()
+        tail, last = 0, b'\n'
+        for chunk in iter(lambda: fd.read(1 << 20), b''):
+            tail += chunk.count(b'\n')
+            last = chunk[-1:]
+        tail += int(last != b'\n')
+        if tail > 0:
+            fd.truncate(cut)
+    return head + tail
 
 
 def check_hairpin( name1: str, name2: str) -> bool:
     """
     """
-    if name1[0] != name2[0]:
-        return False
-    if name1[-1] != 'E':
-        return False
-    if int(name1[1]) == int(name2[1]) + 1:
-        return True
-    if int(name1[1]) == int(name2[1]) - 1:
-        return True
-    return False
+    # Consecutive beta strands of the same layer (e.g. A1E and A2E).
+    return name1[0] == name2[0] and name1[-1] == 'E' and abs(int(name1[1]) - int(name2[1])) == 1
 
 
 def process_master_data( masfile: Path,
@@ -353,20 +562,22 @@ def process_master_data( masfile: Path,
                          hairpin: bool ) -> pd.DataFrame:
     """
     """
-    def cutter(row):
-        match = row['match']
-        # MASTER starts match count at 0!
-        loop = row['abego'][match[0][1] + 1: match[1][0]]
-        return row['abego'][match[0][0]: match[1][1] + 1], loop, len(loop)
-
     if masfile.with_suffix('.csv').is_file():
-        df = pd.read_csv(masfile.with_suffix('.csv'))
-        df['match'] = df['match'].apply(literal_eval)
+        df = pd.read_csv(masfile.with_suffix('.csv'), dtype={'pdb': str, 'chain': str})
+        # match is stored as [(ini, end), (ini, end)]
+        df['match'] = [list(map(tuple, np.asarray(x, dtype=int).reshape(-1, 2).tolist()))
+                       for x in df['match'].str.findall(r'-?\d+')]
         return df
 
     dfloop = TButil.parse_master_file(masfile)
-    dfloop = dfloop.merge(abego, on=['pdb', 'chain']).merge(fragfiles, on=['pdb', 'chain']).dropna()
-    dfloop[['abego', 'loop', 'loop_length']] = dfloop.apply(cutter, axis=1, result_type='expand')
+    # abego and fragfiles are indexed by (pdb, chain) once, when loaded.
+    dfloop = (dfloop.join(abego, on=['pdb', 'chain'], how='inner').join(fragfiles, on=['pdb', 'chain'], how='inner')
+              .reset_index(drop=True).dropna())
+    # MASTER starts match count at 0!
+    pairs = list(zip(dfloop['abego'].values, dfloop['match'].values))
+    loops = [ab[m[0][1] + 1: m[1][0]] for ab, m in pairs]
+    dfloop = dfloop.assign(abego=[ab[m[0][0]: m[1][1] + 1] for ab, m in pairs],
+                           loop=loops, loop_length=[len(x) for x in loops])
     dfloop = dfloop.iloc[:top_loops]
     dfloop['length_count'] = dfloop.loop_length.map(dfloop.loop_length.value_counts())
     dfloop.drop(columns=['pds_path']).to_csv(masfile.with_suffix('.all.csv'), index=False)
@@ -379,7 +590,11 @@ def process_master_data( masfile: Path,
         pick = finaldf[finaldf['length_count'] == finaldf['length_count'].max()]['loop_length'].min()
     finaldf = finaldf[finaldf['loop_length'] == pick]
 
-    TButil.plot_loop_length_distribution(dfloop, pick, masfile.with_suffix(''), 'loop {} <-> {}'.format(name1, name2))
+    if TBcore.get_option('system', 'plots'):
+        fig, _ = TButil.plot_loop_length_distribution(dfloop, pick, masfile.with_suffix(''),
+                                                      'loop {} <-> {}'.format(name1, name2))
+        if not TBcore.get_option('system', 'jupyter'):
+            plt.close(fig)
 
     df = finaldf.drop(columns=['pds_path'])
     df.to_csv(masfile.with_suffix('.csv'), index=False)
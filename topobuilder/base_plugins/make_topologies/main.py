@@ -14,11 +14,17 @@ import random
 import math
 
 # External Libraries
+import numpy as np
 import networkx as nx
+from scipy.spatial.distance import pdist, squareform
+try:
+    import numba
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
 
 # This Library
 from topobuilder.case import Case
-from topobuilder.case.schema import CoordinateSchema
 import topobuilder.core as TBcore
 import topobuilder.utils as TButil
 
@@ -81,9 +87,10 @@ def case_apply( case: Case, representatives: bool = False, sampling: float = 1 )
 
 
 def explore_connectivities( case: Case ) -> Case:
+    """Returns a new :class:`.Case` with all the connectivities of the architecture.
+
+    The given ``case`` is only read, never modified, so it is not copied here.
     """
-    """
-    case = Case(case)
     if TBcore.get_option('system', 'verbose'):
         sys.stdout.write('Exploring connectivities for {}\n'.format(case.architecture_str))
 
@@ -91,10 +98,7 @@ def explore_connectivities( case: Case ) -> Case:
     G = make_graph(case)
 
     # Run connectivities
-    topologies = []
-    for n1, n2 in itertools.combinations(G.nodes(), 2):
-        for p in search_paths(G, n1, n2):
-            topologies.append(p)
+    topologies = search_paths(G)
 
     if TBcore.get_option('system', 'verbose'):
         sys.stdout.write('Explored a total of {} unique connectivities\n'.format(len(topologies)))
@@ -107,17 +111,10 @@ def eval_representatives( case: Case, representatives: bool, sampling: float = 1
     """
     # Calculate representatives
     sse = list(itertools.chain.from_iterable([[sse['id'] for sse in layer] for layer in case['topology.architecture']]))
-    cyc = itertools.cycle([0, 1])
-
     reps = {}
     sper = {}
     prim = []
-    for cn in case.connectivities_str:
-        dpf = []
-        for x in cn.split('.'):
-            dpf.append((x, str(next(cyc))))
-        dpf = dict(dpf)
-        pfl = ''.join(map(dict(dpf).get, sse))
+    for cn, pfl in zip(case.connectivities_str, direction_profiles(case.connectivities_str, sse)):
         reps.setdefault(pfl, []).append(cn)
         if len(reps[pfl]) == 1:
             prim.append(cn.split('.'))
@@ -145,45 +142,174 @@ def eval_representatives( case: Case, representatives: bool, sampling: float = 1
     return cases
 
 
+def direction_profiles( connectivities: List[str], sse: List[str] ) -> List[str]:
+    """Direction (0/1 alternation along the connectivity) of each SSE, in architecture order.
+
+    Every connectivity starts its alternation at 0, so the profile of a connectivity
+    does not depend on its position in the list.
+    """
+    if len(connectivities) == 0:
+        return []
+    arr = np.array([cn.split('.') for cn in connectivities])
+    k, n = arr.shape
+    sorted_sse = np.sort(np.asarray(sse))
+    # Position of each SSE (in sorted order) inside each connectivity.
+    where = np.empty((k, n), dtype=int)
+    np.put_along_axis(where, np.searchsorted(sorted_sse, arr), np.arange(n)[None, :].repeat(k, axis=0), axis=1)
+    phase = where[:, np.searchsorted(sorted_sse, sse)] % 2
+    return [row.tobytes().decode() for row in (phase + ord('0')).astype(np.uint8)]
+
+
 def make_graph( case: Case ) -> nx.Graph:
     """
     """
     # We will need distances between SSE
     case = case.cast_absolute()
-    schema = CoordinateSchema()
     maxl = case['configuration.defaults.distance.max_loop']
 
     a = case['topology.architecture']
     G = nx.Graph()
 
+    # All SSE at once: identifier, layer, position in layer, type and coordinates.
+    sses = list(itertools.chain.from_iterable(a))
+    if len(sses) == 0:
+        return G
+    ids = [sse['id'] for sse in sses]
+    layer = np.asarray([i for i, ly in enumerate(a) for _ in ly])
+    position = np.asarray([int(sse['id'][1:-1]) for sse in sses])
+    types = np.asarray([sse['type'] for sse in sses])
+    coords = np.asarray([[sse['coordinates'][k] for k in 'xyz'] for sse in sses], dtype=float)
+    close = squareform(pdist(coords)) <= maxl
+
     # Inner layer links
-    for layer in a:
-        for pair in itertools.combinations(layer, 2):
-            # Mix types in layers might need special considerations
-            if pair[0]['type'] == pair[1]['type']:
-                # Betas can connect to +2 (for greek keys)
-                if pair[0]['type'] in ['E', ]:
-                    if abs(int(pair[0]['id'][1:-1]) - int(pair[1]['id'][1:-1])) > 2:
-                        continue
-                # Alphas can connect to +1
-                if pair[0]['type'] in ['H', 'G']:
-                    if abs(int(pair[0]['id'][1:-1]) - int(pair[1]['id'][1:-1])) > 1:
-                        continue
-            if schema.distance(pair[0]['coordinates'], pair[1]['coordinates']) <= maxl:
-                G.add_edge(pair[0]['id'], pair[1]['id'])
+    # Mix types in layers might need special considerations
+    gap = np.abs(position[:, None] - position[None, :])
+    same_type = types[:, None] == types[None, :]
+    # Betas can connect to +2 (for greek keys)
+    beta = (types == 'E')[:, None] & (gap > 2)
+    # Alphas can connect to +1
+    alpha = np.isin(types, ['H', 'G'])[:, None] & (gap > 1)
+    inner = np.triu(layer[:, None] == layer[None, :], 1) & ~(same_type & (beta | alpha)) & close
+    G.add_edges_from((ids[i], ids[j]) for i, j in np.argwhere(inner))
 
     # Layer to Layer links (consecutive layers only)
-    for ly1, ly2 in zip(a[:-1], a[1:]):
-        for sse1, sse2 in itertools.product(*[ly1, ly2]):
-            if schema.distance(sse1['coordinates'], sse2['coordinates']) <= maxl:
-                G.add_edge(sse1['id'], sse2['id'])
+    outer = (layer[None, :] == layer[:, None] + 1) & close
+    G.add_edges_from((ids[i], ids[j]) for i, j in np.argwhere(outer))
     return G
 
 
-def search_paths(G: nx.Graph, n1: str, n2: str) -> List:
+def search_paths( G: nx.Graph ) -> List:
+    """Find all the paths that visit every node of the graph (Hamiltonian paths).
+
+    Each path is explored once, from its first node (in graph order), and is
+    followed by its reverse. Paths come sorted by start and end node.
+    """
+    nodes = list(G.nodes())
+    idx = {n: i for i, n in enumerate(nodes)}
+    # Neighbours as indices (keeping networkx order) and as bitmasks.
+    adj = [[idx[m] for m in G[n]] for n in nodes]
+    adj_mask = [sum(1 << m for m in ngb) for ngb in adj]
+
+    # A path can only have two ends.
+    if len(nodes) == 0 or sum(1 for ngb in adj if len(ngb) < 2) > 2 or any(len(ngb) == 0 for ngb in adj):
+        return []
+
+    if _NUMBA_AVAILABLE and len(nodes) < 63:
+        padded = np.full((len(nodes), max(len(ngb) for ngb in adj)), -1, dtype=np.int32)
+        for i, ngb in enumerate(adj):
+            padded[i, :len(ngb)] = ngb
+        paths = _hamiltonian_kernel(padded, np.asarray(adj_mask, dtype=np.int64), len(nodes))
+        paths = paths[np.lexsort((paths[:, -1], paths[:, 0]))].tolist()
+    else:
+        paths = _hamiltonian_paths(adj, adj_mask)
+
     conns = []
-    for path in nx.all_simple_paths(G, n1, n2):
-        if len(path) == nx.number_of_nodes(G):
-            conns.append(path)
-            conns.append(list(reversed(path)))
+    for path in paths:
+        path = [nodes[i] for i in path]
+        conns.append(path)
+        conns.append(list(reversed(path)))
     return conns
+
+
+def _hamiltonian_paths( adj: List[List[int]], adj_mask: List[int] ) -> List[List[int]]:
+    """Pure python Hamiltonian path search over node indices.
+    """
+    full = (1 << len(adj)) - 1
+
+    def extend( path: List, visited: int, found: Dict ):
+        cur = path[-1]
+        if visited == full:
+            if cur > path[0]:
+                found.setdefault(cur, []).append(list(path))
+            return
+        if adj_mask[cur] & ~visited == 0:
+            return
+        for m in adj[cur]:
+            if not visited >> m & 1:
+                path.append(m)
+                extend(path, visited | 1 << m, found)
+                path.pop()
+
+    paths = []
+    for start in range(len(adj)):
+        found = {}
+        extend([start], 1 << start, found)
+        for end in sorted(found):
+            paths.extend(found[end])
+    return paths
+
+
+def _hamiltonian_kernel( adj: np.ndarray, adj_mask: np.ndarray, n: int ) -> np.ndarray:
+    """Iterative version of :func:`_hamiltonian_paths`, compiled with numba when available.
+
+    :param adj: Neighbour indices of each node, padded with -1.
+    :param adj_mask: Neighbour bitmask of each node.
+    :param n: Number of nodes (< 63).
+
+    :return: One row per path, in search order.
+    """
+    full = (np.int64(1) << n) - 1
+    out = np.empty((64, n), dtype=np.int32)
+    count = 0
+    path = np.empty(n, dtype=np.int32)
+    slot = np.zeros(n, dtype=np.int32)
+    for start in range(n):
+        path[0] = start
+        slot[0] = 0
+        visited = np.int64(1) << start
+        depth = 0
+        while depth >= 0:
+            cur = path[depth]
+            if visited == full:
+                if cur > start:
+                    if count == out.shape[0]:
+                        grown = np.empty((out.shape[0] * 2, n), dtype=np.int32)
+                        grown[:count] = out
+                        out = grown
+                    out[count] = path
+                    count += 1
+                visited ^= np.int64(1) << cur
+                depth -= 1
+                continue
+            advanced = False
+            if adj_mask[cur] & ~visited != 0:
+                while slot[depth] < adj.shape[1]:
+                    m = adj[cur, slot[depth]]
+                    slot[depth] += 1
+                    if m < 0:
+                        break
+                    if (visited >> m) & 1 == 0:
+                        depth += 1
+                        path[depth] = m
+                        slot[depth] = 0
+                        visited |= np.int64(1) << m
+                        advanced = True
+                        break
+            if not advanced:
+                visited ^= np.int64(1) << cur
+                depth -= 1
+    return out[:count]
+
+
+if _NUMBA_AVAILABLE:
+    _hamiltonian_kernel = numba.njit(cache=True)(_hamiltonian_kernel)
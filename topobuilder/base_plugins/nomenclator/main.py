@@ -9,7 +9,6 @@
 # Standard Libraries
 from typing import List, Union, Dict
 import sys
-import copy
 
 # External Libraries
 
@@ -55,9 +54,14 @@ def apply( cases: List[Case],
     """
     TButil.plugin_title(__file__, len(cases))
 
+    # Unify subnames behaviour for 1 to N once for all cases
+    if not isinstance(subnames, list):
+        subnames = [subnames, ]
+
+    # set_protocol_done already returns a new Case, which can be renamed in place.
     for i, case in enumerate(cases):
-        cases[i] = case_apply(case, subnames)
-        cases[i] = cases[i].set_protocol_done(prtid)
+        kase = case.set_protocol_done(prtid)
+        cases[i] = rename_case(kase if kase is not case else Case(case), subnames)
 
     return cases
 
@@ -73,29 +77,37 @@ def case_apply( case: Case,
 
     :return: :class:`.Case` with ``configuration.name`` modified
     """
-    kase = Case(case)
+    return rename_case(Case(case), subnames)
+
+
+def rename_case( kase: Case, subnames: Union[str, List[str]] ) -> Case:
+    """Add subnames to a Case in place.
+
+    :param kase: Target :class:`.Case`, already copied by the caller.
+    :param subnames: List of or subname to append.
+
+    :return: The same :class:`.Case`, with ``configuration.name`` modified
+    """
+    name = kase.name
 
     # Unify subnames behaviour for 1 to N
     if not isinstance(subnames, list):
         subnames = [subnames, ]
 
-    # Reserved keywords
-    for i, sn in enumerate(subnames):
-        if sn == 'architecture':
-            subnames[i] = kase.architecture_str.replace('.', '')
+    # Reserved keywords (substituted on a copy: subnames is shared by all cases)
+    sn = [kase.architecture_str.replace('.', '') if x == 'architecture' else x for x in subnames]
 
     # Check name was not already added.
-    sn = copy.deepcopy(subnames)
-    if kase.name.endswith('_'.join(sn)):
-        TButil.plugin_warning('Seems the subnames {} already existed.'.format('_'.join(sn)))
+    suffix = '_'.join(sn)
+    if name.endswith(suffix):
+        TButil.plugin_warning('Seems the subnames {} already existed.'.format(suffix))
         TButil.plugin_warning('Will NOT re-append.')
         return kase
 
     # Add new names
-    sn.insert(0, kase.name)
-    kase.data['configuration']['name'] = '_'.join(sn)
+    kase.data['configuration']['name'] = '{}_{}'.format(name, suffix)
 
     if TBcore.get_option('system', 'verbose'):
-        sys.stdout.write('Renamed case {} to {}\n'.format(case.name, kase.name))
+        sys.stdout.write('Renamed case {} to {}\n'.format(name, kase.name))
 
     return kase
@@ -58,13 +58,17 @@ def apply( cases: List[Case],
     TButil.plugin_title(__file__, len(cases))
 
     # File management
+    # Folders are only created once there is an image to write.
+    isdir = outfile is None
     if outfile is None:
-        outfile = cases[0].main_path.joinpath('images').resolve()
-        outfile.mkdir(parents=True, exist_ok=True)
-    if isinstance(outfile, str):
-        outfile = Path(outfile).resolve()
+        outfile = cases[0].main_path.joinpath('images')
+    outfile = Path(outfile).resolve()
+    isdir = isdir or outfile.is_dir()
 
     outformat = TBcore.get_option('system', 'image')
+    overwrite = TBcore.get_option('system', 'overwrite')
+    dpi = TBcore.get_option('system', 'dpi')
+    jupyter = TBcore.get_option('system', 'jupyter')
 
     # Checking available plot_types
     plot_types = [_PLT_TYPES_[0], ] if plot_types is None else plot_types
@@ -72,20 +76,28 @@ def apply( cases: List[Case],
         raise ValueError('Requested unknown plot format. '
                          'Available are: {}'.format(','.join(_PLT_TYPES_)))
 
+    # Images that need to be made; when all exist, nothing else is done.
+    if isdir:
+        prefix = prefix if prefix is not None else '{}.{:02d}'.format(os.getppid(), prtid)
+        base = os.path.join(str(outfile), prefix)
+    else:
+        base = str(outfile)
+    targets = []
     for ptype in plot_types:
-        if outfile.is_dir():
-            prefix = prefix if prefix is not None else ".".join([str(os.getppid()), '{:02d}'.format(prtid)])
-            thisoutfile = outfile.joinpath(".".join([prefix, ptype + outformat]))
-        else:
-            thisoutfile = Path(str(outfile) + '.' + ptype + outformat)
-        thisoutfile.parent.mkdir(parents=True, exist_ok=True)
-        if not TBcore.get_option('system', 'overwrite') and thisoutfile.is_file():
+        thisoutfile = Path('{}.{}{}'.format(base, ptype, outformat))
+        if not overwrite and thisoutfile.is_file():
             sys.stderr.write('Unable to overwrite file {}: Already exists\n'.format(thisoutfile))
             continue
-
-        fig, ax = getattr(pts, ptype)(cases, **kwargs.pop(ptype, {}))
-        plt.tight_layout()
-        plt.savefig(str(thisoutfile), dpi=300)
+        targets.append((ptype, thisoutfile))
+
+    for folder in set(thisoutfile.parent for _, thisoutfile in targets):
+        folder.mkdir(parents=True, exist_ok=True)
+    for ptype, thisoutfile in targets:
+        fig, ax = getattr(pts, ptype)(cases, **kwargs.get(ptype, {}))
+        fig.tight_layout()
+        fig.savefig(str(thisoutfile), dpi=dpi)
+        if not jupyter:
+            plt.close(fig)
 
         TButil.plugin_imagemaker('Creating new image at: {}'.format(str(thisoutfile)))
 
@@ -58,7 +58,7 @@ def main( options ):
 
     for pdbf in Path(options.indir).glob('*pdb'):
         data.append(TButil.pdb_geometry_from_rules(pdbf, rules))
-        sys.stdout.flush()
+    sys.stdout.flush()
 
     df = pd.concat(data)
     df.to_csv(options.out, index=False)
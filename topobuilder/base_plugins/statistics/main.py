@@ -16,7 +16,6 @@ from subprocess import run
 from inspect import getmembers, isfunction
 
 # External Libraries
-import pandas as pd
 
 # This Library
 from topobuilder.case import Case
@@ -150,5 +149,5 @@ def postprocess( analysis: str, wfolder: Path ):
     """
     """
     if analysis == 'geometry':
-        df = pd.concat([pd.read_csv(x) for x in Path(wfolder).glob('_geometry.*.csv')])
-        df.to_csv(wfolder.joinpath('geometry.csv'), index=False)
+        # All task outputs share the same header: stream them instead of parsing.
+        TButil.concat_csv_files(sorted(Path(wfolder).glob('_geometry.*.csv')), Path(wfolder).joinpath('geometry.csv'))
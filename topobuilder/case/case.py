@@ -38,6 +38,9 @@ __all__ = ['Case']
 
 C = TypeVar('C', bound='Case')
 
+_ARCHITECTURE_LAYER_PATTERN_ = re.compile(r'^(\d+)([EH])$')
+_TOPOLOGY_SSE_PATTERN_ = re.compile(r'^([A-Z])(\d+)([EH])(\d*)$')
+
 
 class Case( object ):
     """
@@ -312,6 +315,9 @@ class Case( object ):
             ppfl.setdefault(sse[2]['id'], int(pfl[i]))
 
         ordsse = c.ordered_structures
+        # Avoid get_sse_by_id (a full copy of the SSE) inside the pairing loops.
+        crd = {x['id']: x['coordinates'] for x in ordsse}
+        dist = schema.distance
         E = [(i + 1, x['id'], ppfl[x['id']]) for i, x in enumerate([x for x in ordsse if x['type'] == 'E'])]
         H = [(i + 1, x['id'], ppfl[x['id']]) for i, x in enumerate([x for x in ordsse if x['type'] == 'H'])]
 
@@ -329,7 +335,7 @@ class Case( object ):
             for j in range(i + 1, len(H)):
                 n1, n2 = h[1], H[j][1]
                 ld = abs(ascii_uppercase.find(n1[0]) - ascii_uppercase.find(n2[0]))
-                cd = schema.distance(c.get_sse_by_id(n1)['coordinates'], c.get_sse_by_id(n2)['coordinates'])
+                cd = dist(crd[n1], crd[n2])
                 if ld == 1 and cd < 15:  # Distance defined in Rosetta's HelixPairingFilter
                         hh_pair.append('{}-{}.{}'.format(h[0], H[j][0], 'A' if h[-1] != H[j][-1] else 'P'))
 
@@ -338,10 +344,8 @@ class Case( object ):
             for h in H:
                 ld = abs(ascii_uppercase.find(h[1][0]) - ascii_uppercase.find(ss[0][1][0]))
                 if ld <= 1:
-                    cd1 = schema.distance(c.get_sse_by_id(h[1])['coordinates'],
-                                          c.get_sse_by_id(ss[0][1])['coordinates'])
-                    cd2 = schema.distance(c.get_sse_by_id(h[1])['coordinates'],
-                                          c.get_sse_by_id(ss[1][1])['coordinates'])
+                    cd1 = dist(crd[h[1]], crd[ss[0][1]])
+                    cd2 = dist(crd[h[1]], crd[ss[1][1]])
                     if cd1 >= 7.5 and cd1 <= 13 and cd2 >= 7.5 and cd2 <= 13:
                         hss_triplets.append('{},{}-{}'.format(h[0], ss[0][0], ss[1][0]))
 
@@ -1096,14 +1100,13 @@ def architecture_cast( architecture: Union[str, List, dict] ) -> Union[dict, str
     """
     """
     if isinstance(architecture, str):
-        expression = re.compile(r'^(\d+)([EH])$')
         architecture = architecture.upper()
         asciiU = string.ascii_uppercase
         result = {'architecture': []}
 
         for layer in architecture.split('.'):
             layer = layer.split(':')
-            m = re.match(expression, layer[0])
+            m = _ARCHITECTURE_LAYER_PATTERN_.match(layer[0])
             if not m:
                 raise CaseError('Architecture format not recognized.')
             result['architecture'].append([])
@@ -1138,7 +1141,6 @@ def topology_cast( topology: Union[str, dict], count: Optional[int] = 0 ) -> Uni
     """
     """
     if isinstance(topology, str):
-        expression = re.compile(r'^([A-Z])(\d+)([EH])(\d*)$')
         topology = topology.upper()
         result = {'architecture': [], 'connectivity': []}
         architecture = []
@@ -1147,7 +1149,7 @@ def topology_cast( topology: Union[str, dict], count: Optional[int] = 0 ) -> Uni
             result['connectivity'].append([])
             architecture.append([])
             for sse in topo.split('.'):
-                m = re.match(expression, sse)
+                m = _TOPOLOGY_SSE_PATTERN_.match(sse)
                 if not m:
                     raise CaseError('Topology format not recognized.')
                 sse_id = '{0}{1}{2}'.format(m.group(1), m.group(2), m.group(3))
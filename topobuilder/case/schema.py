@@ -171,7 +171,7 @@ class StructureSchema( Schema ):
     class Meta:
         ordered = True
 
-    id = fields.String(validate=Regexp(_ACCEPTED_SSE_ID_, error=_ACCEPTED_SSE_ID_ERROR_),
+    id = fields.String(validate=Regexp(_ACCEPTED_SSE_ID_PATTERN_, error=_ACCEPTED_SSE_ID_ERROR_),
                        metadata='Secondary structure identifier.')
     type = fields.String(required=True, default='<type>',
                          validate=Regexp(_ACCEPTED_SSE_PATTERN_, error=_ACCEPTED_SSE_ERROR_),
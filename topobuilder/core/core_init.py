@@ -24,6 +24,8 @@ with core.ifndef():
     core.register_option('system', 'overwrite', False, 'bool', 'Overwrite existing structure files.')
     core.register_option('system', 'forced', False, 'bool', 'Ignore checkpoints and redo calculations.')
     core.register_option('system', 'image', '.png', 'string', 'Format to output images', ['.png', '.svg'])
+    core.register_option('system', 'dpi', 300, 'int', 'Resolution of raster (.png) images.')
+    core.register_option('system', 'plots', True, 'bool', 'Generate summary plots of intermediate analyses.')
     core.register_option('system', 'jupyter', 'JPY_PARENT_PID' in os.environ, 'bool',
                          'Is TopoBuilder run from a notebbok?', locked=True)
 
@@ -43,6 +45,7 @@ with core.ifndef():
     core.register_option('master', 'create', shutil.which('createPDS'), 'path_in', 'createPDS executable.')
     core.register_option('master', 'pds', None, 'path_in', 'Local PDS database.')
     core.register_option('master', 'pdb', None, 'path_in', 'Local PDB database.')
+    core.register_option('master', 'jobs', 4, 'int', 'Maximum number of MASTER searches run at once.')
 
     # For plugins that requires RosettaScripts
     core.register_option('rosetta', 'scripts', None, 'path_in', 'Full path to the rosetta_scripts executable.')
@@ -179,8 +179,9 @@ def _create_forms_by_specification( layers, distance, connectivity ):
 def _search_paths(G, n1, n2):
     forms = []
     print "\t\t", n1.desc, "-->", n2.desc
-    for path in nx.all_simple_paths(G, n1, n2):
-        if len(path) == nx.number_of_nodes(G):
+    n = nx.number_of_nodes(G)
+    for path in nx.all_simple_paths(G, n1, n2, cutoff=n - 1):
+        if len(path) == n:
             f = FakeForm(copy.deepcopy(path))
             forms.append(f)
             path.reverse()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+.. codeauthor:: Jaume Bonet <jaume.bonet@gmail.com>
+
+.. affiliation::
+    Laboratory of Protein Design and Immunoengineering <lpdi.epfl.ch>
+    Bruno Correia <bruno.correia@epfl.ch>
+"""
+# External Libraries
+import pytest
+
+# This Library
+from topobuilder.base_plugins.imaster.analysis import get_steps
+
+
+class TestIMaster( object ):
+    """
+    Test the architecture helpers of the imaster plugin.
+    """
+    @pytest.mark.parametrize('blist, steps', [
+        ((True, False), ((0,), (0, 1))),
+        ((False, True), ((1,), (0, 1))),
+        ((False, False), ((0,), (0, 1))),
+        ((False, False, False), ((0,), (0, 1), (1, 2))),
+        ((False, True, False), ((1,), (0, 1), (1, 2))),
+        ((False, True, True, False), ((1,), (1, 2), (0, 1), (2, 3))),
+        ((False, True, False, True), ((1,), (3,), (0, 1), (1, 2), (2, 3))),
+        ((False, True, True, False, True), ((1,), (4,), (1, 2), (0, 1), (2, 3), (3, 4)))
+    ])
+    def test_get_steps( self, blist, steps ):
+        assert get_steps(blist) == steps
+
+    def test_get_steps_cached( self ):
+        steps = get_steps((False, True, False))
+        assert isinstance(steps, tuple)
+        assert all(isinstance(x, tuple) for x in steps)
+        # Memoized: same call returns the very same (immutable) object.
+        assert get_steps((False, True, False)) is steps
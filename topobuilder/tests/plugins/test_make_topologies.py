@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+.. codeauthor:: Jaume Bonet <jaume.bonet@gmail.com>
+
+.. affiliation::
+    Laboratory of Protein Design and Immunoengineering <lpdi.epfl.ch>
+    Bruno Correia <bruno.correia@epfl.ch>
+"""
+# Standard Libraries
+import itertools
+
+# External Libraries
+import pytest
+import networkx as nx
+
+# This Library
+import topobuilder.base_plugins.make_topologies.main as mt
+
+
+def all_simple_full_paths( G: nx.Graph ) -> list:
+    """Reference search: full length simple paths between every pair of nodes, each followed by its reverse.
+    """
+    paths = []
+    for n1, n2 in itertools.combinations(G.nodes(), 2):
+        for path in nx.all_simple_paths(G, n1, n2):
+            if len(path) == G.number_of_nodes():
+                paths.append(path)
+                paths.append(list(reversed(path)))
+    return paths
+
+
+def named( G: nx.Graph ) -> nx.Graph:
+    """Relabel nodes with SSE-like identifiers, keeping the node order.
+    """
+    return nx.relabel_nodes(G, {n: 'A{}E'.format(i + 1) for i, n in enumerate(G.nodes())})
+
+
+class TestSearchPaths( object ):
+    """
+    Test the Hamiltonian path search against networkx.
+    """
+    graphs = [nx.path_graph(4), nx.cycle_graph(5), nx.complete_graph(4), nx.star_graph(3),
+              nx.grid_2d_graph(2, 3), nx.ladder_graph(3), nx.wheel_graph(5),
+              nx.gnp_random_graph(7, 0.5, seed=1), nx.gnp_random_graph(8, 0.4, seed=7)]
+
+    @pytest.mark.parametrize('kernel', [False, True])
+    @pytest.mark.parametrize('G', graphs)
+    def test_search_paths( self, G, kernel, monkeypatch ):
+        # Without numba, the kernel runs as plain python (same code, not compiled).
+        monkeypatch.setattr(mt, '_NUMBA_AVAILABLE', kernel)
+        G = named(G)
+        assert mt.search_paths(G) == all_simple_full_paths(G)
+
+    def test_search_paths_empty( self ):
+        assert mt.search_paths(nx.Graph()) == []
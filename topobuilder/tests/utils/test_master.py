@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+.. codeauthor:: Jaume Bonet <jaume.bonet@gmail.com>
+
+.. affiliation::
+    Laboratory of Protein Design and Immunoengineering <lpdi.epfl.ch>
+    Bruno Correia <bruno.correia@epfl.ch>
+"""
+# Standard Libraries
+import os
+from ast import literal_eval
+from pathlib import Path
+
+# External Libraries
+import pytest
+import numpy as np
+import pandas as pd
+
+# This Library
+from topobuilder.utils import parse_master_file
+
+
+def legacy_parse_master_file( filename: str, max_rmsd: float = None, piece_count: int = 18, shift_0: bool = False ) -> pd.DataFrame:
+    """Column based MASTER parser, as it was before the line based rewrite.
+    """
+    def shift(x):
+        return np.asarray(np.asarray(x) + 1).tolist()
+
+    df = pd.read_csv(filename,
+                     names=list(range(piece_count + 2)), engine='python',
+                     sep=r'\s+', header=None).dropna(axis=1, how='all')
+    df['match'] = df[df.columns[2:]].astype(str).sum(axis=1).apply(literal_eval)
+    if shift_0:
+        df['match'] = df['match'].apply(shift)
+    df = df.rename(columns={0: 'rmsd', 1: 'pds_path'})
+    df = df.drop(columns=[i for i in df.columns if isinstance(i, int)])
+    df[['pdb', 'chain']] = (pd.DataFrame(list(df['pds_path'].str.replace('.pds', '', regex=False)
+                            .apply(lambda x: os.path.basename(x).split('_')).values)))
+    if max_rmsd is not None:
+        df = df[(df['rmsd'] <= max_rmsd)]
+    return df[['rmsd', 'pds_path', 'pdb', 'chain', 'match']]
+
+
+class TestMaster( object ):
+    """
+    Test reading MASTER match files.
+    """
+    def setup( self ):
+        self.datadir = Path(__file__).parent.joinpath('..', 'data').resolve()
+
+    @pytest.mark.parametrize('shift_0', [False, True])
+    @pytest.mark.parametrize('max_rmsd', [None, 1.5])
+    def test_parse_master_file( self, shift_0, max_rmsd ):
+        filename = str(self.datadir.joinpath('test_minimal.master'))
+        df = parse_master_file(filename, max_rmsd=max_rmsd, shift_0=shift_0)
+        # Values must match; string dtypes depend on the pandas version.
+        pd.testing.assert_frame_equal(df, legacy_parse_master_file(filename, max_rmsd=max_rmsd, shift_0=shift_0),
+                                      check_dtype=False, check_column_type=False)
+
+    def test_parse_master_file_shift( self ):
+        filename = str(self.datadir.joinpath('test_minimal.master'))
+        df0 = parse_master_file(filename)
+        df1 = parse_master_file(filename, shift_0=True)
+        assert df0['match'].iloc[1] == [(0, 5), (7, 12), (101, 109)]
+        assert df1['match'].iloc[1] == [[1, 6], [8, 13], [102, 110]]
+        assert list(df0['chain']) == ['A', 'B', 'AA', 'C', 'D']
@@ -12,6 +12,8 @@ from pathlib import Path, PosixPath
 import json
 import sys
 from types import GeneratorType
+import tempfile
+import os
 
 # External Libraries
 import numpy as np
@@ -68,5 +70,24 @@ def checkpoint_out( filename: Union[Path, str], data: Dict ):
 
     if TBcore.get_option('system', 'verbose'):
         sys.stdout.write('CHECKPOINT: Creating at {}\n'.format(filename))
-    with filename.open('w') as fd:
-        json.dump(data, fd, cls=GeneralEncoder)
+    # Write to a temporary file first so that an interrupted run never leaves a truncated checkpoint.
+    fd, tmpname = tempfile.mkstemp(prefix='.{}.'.format(filename.name), dir=str(filename.parent))
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh, cls=GeneralEncoder)
+        # mkstemp creates the file as 0600; keep the mode a plain open() would give.
+        os.chmod(tmpname, _file_mode(filename))
+        os.replace(tmpname, str(filename))
+    except BaseException:
+        os.unlink(tmpname)
+        raise
+
+
+def _file_mode( filename: Path ) -> int:
+    """Permissions of an existing file, or the default ones for a new file under the current umask.
+    """
+    if filename.is_file():
+        return filename.stat().st_mode & 0o777
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
@@ -12,7 +12,7 @@ import os
 import shlex
 from pathlib import Path
 from typing import Optional, Tuple, List, Union
-from ast import literal_eval
+from functools import lru_cache
 from tempfile import NamedTemporaryFile
 
 # External Libraries
@@ -23,7 +23,7 @@ import numpy as np
 import topobuilder.core as TBcore
 from .plugins import plugin_filemaker
 
-__all__ = ['createPDS', 'master_best_each', 'parse_master_file', 'pds_database']
+__all__ = ['get_master_exes', 'createPDS', 'master_best_each', 'parse_master_file', 'pds_database', 'list_pds_database']
 
 pds_file = None
 pds_list = None
@@ -73,13 +73,13 @@ def pds_database( force: Optional[bool] = False ) -> Tuple[Path, List]:
     pds_list = []
     pds_file = Path(pds_file)
     if pds_file.is_file():
-        pds_list = [line.strip() for line in open(pds_file).readlines() if len(line.strip()) > 0]
+        pds_list = list(list_pds_database(str(pds_file), pds_file.stat().st_mtime))
         return pds_file, pds_list
     elif pds_file.is_dir():
-        pds_list = [str(x.resolve()) for x in pds_file.glob('*/*.pds')]
+        pds_list = list(list_pds_database(str(pds_file), pds_file.stat().st_mtime))
         f = NamedTemporaryFile(mode='w', delete=False)
         plugin_filemaker('Temporary file for PDS database: {}'.format(f.name))
-        [f.write(x + '\n') for x in pds_list]
+        f.writelines(x + '\n' for x in pds_list)
         f.close()
         pds_file = Path(f.name)
         return pds_file, pds_list
@@ -87,6 +87,33 @@ def pds_database( force: Optional[bool] = False ) -> Tuple[Path, List]:
         raise ValueError('The provided MASTER database directory/list file cannot be found.')
 
 
+@lru_cache(maxsize=8)
+def list_pds_database( database: str, mtime: float ) -> Tuple[str]:
+    """List the PDS files available in a MASTER database.
+
+    :param str database: Path to a list file or to a directory of ``*/*.pds`` files.
+    :param float mtime: Modification time of ``database``. It is only used as part
+        of the cache key, so that a modified database is listed again.
+
+    :return: :class:`tuple` with the PDS file paths.
+    """
+    database = Path(database)
+    if database.is_file():
+        with database.open(buffering=1 << 20) as fd:
+            return tuple(line for line in (raw.strip() for raw in fd) if line)
+    # Equivalent to globbing '*/*.pds' from the resolved root, but scandir already
+    # knows the entry types, so no extra stat/pattern matching is done per file.
+    root = str(database.resolve())
+    pds = []
+    with os.scandir(root) as subs:
+        for sub in subs:
+            if sub.name.startswith('.') or not sub.is_dir():
+                continue
+            with os.scandir(sub.path) as entries:
+                pds.extend(x.path for x in entries if x.name.endswith('.pds') and not x.name.startswith('.'))
+    return tuple(pds)
+
+
 def createPDS( infile: Union[Path, str], outfile: Optional[str] = None ) -> List[str]:
     """Make the createPDS command call.
 
@@ -140,8 +167,8 @@ def parse_master_file( filename: str,
 
     :param str filename: Output file.
     :param float max_rmsd: Maximum RMSD value to recover.
-    :param int piece_count: If known, specify the number of structural pieces
-        in the MASTER search. Otherwise, it is assumed.
+    :param int piece_count: Number of structural pieces in the MASTER search.
+        Not needed anymore, as the match ranges are found in each line.
     :param bool shift_0: MASTER matches start counting in 0. If the flag
         is :data:`.True`, change it to start with 1.
 
@@ -162,21 +189,22 @@ def parse_master_file( filename: str,
     This assumes that the PDS files basename has the standard nomenclature
     ``<pdbid>_<chain>.pds``.
     """
-    def shift(x):
-        return np.asarray(np.asarray(x) + 1).tolist()
-
     if TBcore.get_option('system', 'verbose'):
         sys.stdout.write('Reading MASTER file {}\n'.format(filename))
-    df = pd.read_csv(filename,
-                     names=list(range(piece_count + 2)), engine='python',
-                     sep=r'\s+', header=None).dropna(axis=1, how='all')
-    df['match'] = df[df.columns[2:]].astype(str).sum(axis=1).apply(literal_eval)
+    with open(filename) as fd:
+        lines = pd.Series(fd.read().splitlines())
+    df = lines[lines.str.strip().str.len() > 0].str.extract(r'^\s*(\S+)\s+(\S+)\s+(.+?)\s*$')
+    df.columns = ['rmsd', 'pds_path', 'match']
+    df = df.reset_index(drop=True).assign(rmsd=lambda x: x['rmsd'].astype(float))
+
+    # Match ranges come as [(ini, end), (ini, end), ...]
+    ranges = [np.asarray(x, dtype=int).reshape(-1, 2) for x in df['match'].str.findall(r'-?\d+')]
     if shift_0:
-        df['match'] = df['match'].apply(shift)
-    df = df.rename(columns={0: 'rmsd', 1: 'pds_path'})
-    df = df.drop(columns=[i for i in df.columns if isinstance(i, int)])
-    df[['pdb', 'chain']] = (pd.DataFrame(list(df['pds_path'].str.replace('.pds', '')
-                            .apply(lambda x: os.path.basename(x).split('_')).values)))
+        df['match'] = [(x + 1).tolist() for x in ranges]
+    else:
+        df['match'] = [list(map(tuple, x.tolist())) for x in ranges]
+    df[['pdb', 'chain']] = (df['pds_path'].str.rsplit('/', n=1).str[-1]
+                            .str.replace('.pds', '', regex=False).str.split('_', n=1, expand=True))
     if max_rmsd is not None:
         df = df[(df['rmsd'] <= max_rmsd)]
     return df[['rmsd', 'pds_path', 'pdb', 'chain', 'match']]
@@ -29,6 +29,8 @@ __all__ = ['build_pdb_object', 'pdb_geometry_from_rules']
 
 np.set_printoptions(precision=3)
 
+_PLANES_ = ('layer', 'floor', 'side')
+
 
 def build_pdb_object( sses: List[Dict], loops: Union[List[int], int] ) -> Tuple[Frame3D, List[int]]:
     """
@@ -41,9 +43,10 @@ def build_pdb_object( sses: List[Dict], loops: Union[List[int], int] ) -> Tuple[
     pieces = []
     columns = ['auth_comp_id', 'auth_atom_id', 'auth_seq_id', 'Cartn_x', 'Cartn_y', 'Cartn_z']
     start = 1
+    verbose = TBcore.get_option('system', 'verbose')
     for i, sse in enumerate(sses):
         start = 1 if i == 0 else int(sses[i - 1]['length']) + loops[i - 1] + start
-        if TBcore.get_option('system', 'verbose'):
+        if verbose:
             sys.stdout.write('PDB: Building SSE {:02d}:{} starting at {}\n'.format(i + 1, sse['id'], start))
         pieces.append(PDB(pd.DataFrame(sse['metadata']['atoms'], columns=columns)).renumber(start))
 
@@ -84,15 +87,16 @@ def make_pieces( pdb3d: Frame3D, rules: List[Tuple] ) -> Dict:
     """
     """
     pieces = {}
+    verbose, debug = TBcore.get_option('system', 'verbose'), TBcore.get_option('system', 'debug')
     for piece in rules:
         sse_id, ranges, _ = piece
-        if TBcore.get_option('system', 'debug'):
+        if debug:
             sys.stdout.write('PDB:Individualize SSE:{} of {}\n'.format(sse_id, pdb3d.id))
         with SBIcr.on_option_value('structure', 'source', 'label'):
             segment = pdb3d['Residue:{0}-{1}'.format(ranges[0], ranges[1])]
             pieces.setdefault(sse_id, {}).setdefault('atoms', segment)
         with SBIcr.on_option_value('structure', 'source', 'auth'):
-            if TBcore.get_option('system', 'verbose'):
+            if verbose:
                 first, last = segment.first_compound.number, segment.last_compound.number
                 sys.stdout.write('PDB:{2} - Range: {0}-{1}\n'.format(first, last, pdb3d.id))
     return pieces
@@ -101,15 +105,16 @@ def make_pieces( pdb3d: Frame3D, rules: List[Tuple] ) -> Dict:
 def make_vectors( pieces: Dict, rules: List[Tuple] ) -> Dict:
     """
     """
+    debug = TBcore.get_option('system', 'debug')
     for piece in rules:
         sse_id, _, flip = piece
-        if TBcore.get_option('system', 'debug'):
+        if debug:
             sys.stdout.write('PDB:Getting vector for SSE:{}{}\n'.format(sse_id, '' if not flip else ' - flipped!'))
-        pieces[sse_id].setdefault('vector', list(pieces[sse_id]['atoms'].eigenvectors(40)[-1]))
+        pieces[sse_id].setdefault('vector', np.asarray(pieces[sse_id]['atoms'].eigenvectors(40)[-1], dtype=np.float64))
         if flip:
-            pieces[sse_id]['vector'] = [list(x) for x in np.flip(np.asarray(pieces[sse_id]['vector']), axis=0)]
-        print('PYMOL:make_arrow("vect{0}", {1}, {2})'.format(sse_id, np.asarray(pieces[sse_id]['vector'][0]).tolist(),
-                                                             np.asarray(pieces[sse_id]['vector'][-1]).tolist()))
+            pieces[sse_id]['vector'] = np.flip(pieces[sse_id]['vector'], axis=0)
+        print('PYMOL:make_arrow("vect{0}", {1}, {2})'.format(sse_id, pieces[sse_id]['vector'][0].tolist(),
+                                                             pieces[sse_id]['vector'][-1].tolist()))
     return pieces
 
 
@@ -119,31 +124,26 @@ def make_planes( pieces: Dict ) -> Dict:
     blayers = sorted(set([x[0] for x in pieces if x.endswith('E') and len(x) == 3]))
     hlayers = [x[0] for x in pieces if x.endswith('H') and len(x) == 3]
     hlayers = sorted(set([x for x in hlayers if hlayers.count(x) > 1]))
+    debug = TBcore.get_option('system', 'debug')
 
     for layer in blayers:
-        if TBcore.get_option('system', 'debug'):
+        if debug:
             sys.stdout.write('PDB:Generating plane for beta layer {}\n'.format(layer))
-        pieces.setdefault(layer, {'layer': [], 'floor': [], 'side': []})
         structure = pd.concat([pieces[x]['atoms'] for x in pieces if len(x) == 3 and x.startswith(layer)])
         eign = structure.eigenvectors(30)
         eign = eigenlayers_fix(eign, [pieces[x]['vector'] for x in pieces if len(x) == 3 and x.startswith(layer)])
-        pieces[layer]['layer'] = [list(eign[1][0]), list(eign[1][-1]), list(eign[2][0])]
-        pieces[layer]['floor'] = [list(eign[1][0]), list(eign[1][-1]), list(eign[0][0])]
-        pieces[layer]['side'] = [list(eign[2][0]), list(eign[2][-1]), list(eign[0][0])]
+        pieces[layer] = dict(zip(_PLANES_, layer_planes(eign)))
         for i, v in enumerate([('floor', 'red'), ('side', 'green'), ('layer', 'blue')]):
             print('PYMOL:make_arrow("b{0}", {1}, {2}, color="{3}")'.format(v[0], eign[i][0].tolist(),
                                                                            eign[i][-1].tolist(), v[1]))
 
     for layer in hlayers:
-        if TBcore.get_option('system', 'debug'):
+        if debug:
             sys.stdout.write('PDB:Generating plane for helix layer {}\n'.format(layer))
-        pieces.setdefault(layer, {'layer': [], 'floor': [], 'side': []})
         structure = pd.concat([pieces[x]['atoms'] for x in pieces if len(x) == 3 and x.startswith(layer)])
         eign = structure.eigenvectors(30)
         eign = eigenlayers_fix(eign, [pieces[x]['vector'] for x in pieces if len(x) == 3 and x.startswith(layer)])
-        pieces[layer]['layer'] = [list(eign[1][0]), list(eign[1][-1]), list(eign[2][0])]
-        pieces[layer]['floor'] = [list(eign[1][0]), list(eign[1][-1]), list(eign[0][0])]
-        pieces[layer]['side'] = [list(eign[2][0]), list(eign[2][-1]), list(eign[0][0])]
+        pieces[layer] = dict(zip(_PLANES_, layer_planes(eign)))
         for i, v in enumerate([('floor', 'red'), ('side', 'green'), ('layer', 'blue')]):
             print('PYMOL:make_arrow("h{0}", {1}, {2}, color="{3}")'.format(v[0], eign[i][0].tolist(),
                                                                            eign[i][-1].tolist(), v[1]))
@@ -151,6 +151,17 @@ def make_planes( pieces: Dict ) -> Dict:
     return pieces
 
 
+def layer_planes( eign: np.ndarray ) -> np.ndarray:
+    """Stack the ``layer``, ``floor`` and ``side`` planes of a layer.
+
+    :return: :class:`~numpy.ndarray` of shape ``(3, 3, 3)``; one plane per row
+        defined by three points.
+    """
+    return np.asarray([[eign[1][0], eign[1][-1], eign[2][0]],
+                       [eign[1][0], eign[1][-1], eign[0][0]],
+                       [eign[2][0], eign[2][-1], eign[0][0]]], dtype=np.float64)
+
+
 def eigenlayers_fix( eign: np.ndarray, vectors: np.ndarray, scape: bool = False ) -> np.ndarray:
     """
     """
@@ -190,6 +201,7 @@ def make_angles_and_distances( pieces: Dict ) -> pd.DataFrame:
             'angles_layer': [], 'angles_floor': [], 'angles_side': [],
             'points_layer': [], 'points_floor': [], 'points_side': [],
             'tilted_layer': [], 'tilted_floor': [], 'tilted_side': []}
+    debug = TBcore.get_option('system', 'debug')
 
     for layer in sorted(set([x[0] for x in pieces if len(x) == 1])):
         for sse in [x for x in pieces if len(x) == 3]:
@@ -197,7 +209,7 @@ def make_angles_and_distances( pieces: Dict ) -> pd.DataFrame:
                 data['sse'].append(sse)
                 data['layer'].append(layer)
                 for iplane, plane in enumerate(pieces[layer]):
-                    if TBcore.get_option('system', 'debug'):
+                    if debug:
                         sys.stdout.write('PDB:{} geometry plane {} vs. sse {}\n'.format(plane, layer, sse))
                     syPlane = sy.Plane(sy.Point3D(pieces[layer][plane][0]),
                                        sy.Point3D(pieces[layer][plane][1]),
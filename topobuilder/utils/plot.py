@@ -62,7 +62,7 @@ def plot_fragment_templates( dfsmall: Union[FragmentFrame, pd.DataFrame],
     imagename = Path(str(prefix) + TBcore.get_option('system', 'image'))
     if write:
         plugin_imagemaker('fragment templates image summary at {}'.format(imagename))
-        plt.savefig(imagename, dpi=300)
+        plt.savefig(imagename, dpi=TBcore.get_option('system', 'dpi'))
     return fig, imagename
 
 
@@ -86,7 +86,7 @@ def plot_loop_length_distribution( dfloop: pd.DataFrame,
     imagename = Path(str(prefix) + TBcore.get_option('system', 'image'))
     if write:
         plugin_imagemaker('loop image summary at {}'.format(imagename))
-        plt.savefig(imagename, dpi=300)
+        plt.savefig(imagename, dpi=TBcore.get_option('system', 'dpi'))
     return fig, imagename
 
 
@@ -119,7 +119,7 @@ def plot_match_bin( master_match: pd.DataFrame,
     imagename = Path(str(prefix) + TBcore.get_option('system', 'image'))
     if write:
         plugin_imagemaker('MASTER match image summary at {}'.format(imagename))
-        plt.savefig(imagename, dpi=300)
+        plt.savefig(imagename, dpi=TBcore.get_option('system', 'dpi'))
     return fig, imagename, dict(zip(bins, match_count))
 
 
@@ -152,7 +152,7 @@ def plot_geometric_distributions( df: pd.DataFrame,
     imagename = Path(str(prefix) + TBcore.get_option('system', 'image'))
     if write:
         plugin_imagemaker('Geometric distributions image summary at {}'.format(imagename))
-        plt.savefig(imagename, dpi=300)
+        plt.savefig(imagename, dpi=TBcore.get_option('system', 'dpi'))
     return fig, imagename
 
 
@@ -178,5 +178,5 @@ def plot_angle_network( network: nx.DiGraph,
     imagename = Path(str(prefix) + TBcore.get_option('system', 'image'))
     if write:
         plugin_imagemaker('Layer angle network image summary at {}'.format(imagename))
-        plt.savefig(imagename, dpi=300)
+        plt.savefig(imagename, dpi=TBcore.get_option('system', 'dpi'))
     return fig, imagename
@@ -13,8 +13,9 @@ import time
 import math
 import textwrap
 import tempfile
+import shutil
 from pathlib import Path
-from typing import Union, Optional
+from typing import Union, Optional, List
 import subprocess
 
 # External Libraries
@@ -23,7 +24,7 @@ import subprocess
 import topobuilder.core as TBcore
 
 
-__all__ = ['slurm_header', 'slurm_pyenv', 'submit_slurm', 'submit_nowait_slurm']
+__all__ = ['slurm_header', 'slurm_pyenv', 'submit_slurm', 'submit_nowait_slurm', 'concat_csv_files']
 
 
 def submit_slurm( slurm_file: Union[Path, str],
@@ -139,3 +140,20 @@ def slurm_pyenv() -> str:
         return '\n'
     else:
         return '\n'.join(['source {}'.format(pypath), "export PYTHONPATH=''"]) + '\n'
+
+
+def concat_csv_files( csv_files: List[Union[Path, str]], outfile: Union[Path, str] ):
+    """Join the CSV outputs of the tasks of a SLURM array into a single file.
+
+    All files are expected to share the same header. It is written once and the
+    rest of the files are streamed to the output without parsing them.
+
+    :param csv_files: CSV files to join.
+    :param outfile: Output CSV file.
+    """
+    with open(str(outfile), 'wb') as fd:
+        for i, csv_file in enumerate(csv_files):
+            with open(str(csv_file), 'rb') as fi:
+                if i > 0:
+                    fi.readline()
+                shutil.copyfileobj(fi, fd, 1 << 20)